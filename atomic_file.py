@@ -0,0 +1,19 @@
+import contextlib
+import os
+
+# --- ファイルの置き換えによる書き込み ---
+# 一時ファイルに書き込んでから置き換えるため、読み込む側が書き込み途中のファイルを
+# 読むことはない（同じフォルダ内の os.replace は置き換えが一度に行われる）
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    # path に書き込むための一時ファイルのパスを返し、ブロックを抜けたら path に置き換える
+    # ブロックを例外で抜けた場合は一時ファイルを削除する（書きかけのファイルを残さない）
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,448 @@
+import argparse
+import csv
+import functools
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import draw_all_combine
+import draw_all_combine2
+import numpy as np
+import pandas as pd
+from csv_cache import CACHE_DIR_NAME, read_csv_cached
+from epoch_data import aggregate_epoch_means, split_by_target
+from parallel_render import render_pdf
+from plot_common import (
+    BarPageTemplate,
+    LinePageTemplate,
+    add_panel_arguments,
+    int_at_least,
+    panel_pages,
+)
+from png_to_pdf import pack_combined
+from rmse_data import NO_VARIANCE_MODELS, load_rmse_tables
+from rmse_normalize import NORMALIZATION_MODES, normalize_rmse
+
+# --- 合成データで各処理段階（読み込み・集計・正規化・描画・書き出し）の
+# --- 実行時間とピークメモリを測るベンチマーク ---
+
+# 計測する規模（targets × models）
+PRESETS = {
+    'small': {'targets': [11, 1000], 'models': [3, 10]},
+    'full': {'targets': [11, 1000, 10000, 100000], 'models': [3, 30, 100]},
+}
+
+EPOCHS = [1, 3, 10, 30, 100, 300, 1000, 3000]
+N_FOLDS = 5
+
+# 全targetを描く正規化RMSEのグラフ（段階名 → draw_all_combine* のモジュール）
+# draw_all_combine_both.py は LR / NN / SR 以外のモデルの色を持たないため計測しない
+COMBINE_STAGES = {
+    'write_combine': draw_all_combine,
+    'write_combine2': draw_all_combine2,
+}
+
+
+def model_names(n_models):
+    # LRを基準モデル、SRを分散なしのモデルとして必ず含める
+    names = ['LR', 'NN', 'SR'] + [f"M{i:03d}" for i in range(n_models - 3)]
+    return names[:n_models]
+
+
+def target_names(n_targets):
+    return [f"target_{i:06d}" for i in range(n_targets)]
+
+
+def write_rmse_statistics(data_dir, models, targets, rng):
+    # rmse_statistics_{model}.csv（SRは rmse_sr.csv と同じく分散列なし）
+    csv_files = {}
+    n = len(targets)
+    for model in models:
+        df = pd.DataFrame(
+            {
+                'target': targets,
+                'val_rmse_mean': rng.gamma(2.0, 0.5, n),
+                'test_rmse_mean': rng.gamma(2.0, 0.8, n),
+            }
+        )
+        if model not in NO_VARIANCE_MODELS:
+            df['val_rmse_variance'] = rng.gamma(1.0, 0.01, n)
+            df['test_rmse_variance'] = rng.gamma(1.0, 0.02, n)
+        path = os.path.join(data_dir, f"rmse_statistics_{model}.csv")
+        df.to_csv(path, index=False)
+        csv_files[model] = path
+    return csv_files
+
+
+def write_epoch_results(data_dir, targets, rng):
+    # results_epochs_evaluation.csv（target × epochs × fold）
+    n_rows = len(targets) * len(EPOCHS) * N_FOLDS
+    df = pd.DataFrame(
+        {
+            'target': np.repeat(targets, len(EPOCHS) * N_FOLDS),
+            'epochs': np.tile(np.repeat(EPOCHS, N_FOLDS), len(targets)),
+            'fold': np.tile(np.arange(N_FOLDS), len(targets) * len(EPOCHS)),
+            'val_rmse': rng.gamma(2.0, 0.5, n_rows),
+            'test_rmse': rng.gamma(2.0, 0.8, n_rows),
+            'val_r2': rng.uniform(0, 1, n_rows),
+            'test_r2': rng.uniform(-1, 1, n_rows),
+        }
+    )
+    path = os.path.join(data_dir, 'results_epochs_evaluation.csv')
+    df.to_csv(path, index=False)
+    return path
+
+
+def write_complexity_results(data_dir, targets, n_points, rng):
+    # error_results_{target}.csv（Complexity, Loss, Range2_RMSE）
+    paths = []
+    for target in targets:
+        complexity = np.sort(rng.integers(1, 200, n_points))
+        df = pd.DataFrame(
+            {
+                'Complexity': complexity,
+                'Loss': rng.gamma(2.0, 0.1, n_points) / np.sqrt(complexity),
+                'Range2_RMSE': rng.gamma(2.0, 0.5, n_points),
+            }
+        )
+        path = os.path.join(data_dir, f"error_results_{target}.csv")
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+class StageTimer:
+    # 各段階の実行時間（秒）とピークメモリ（MB、tracemalloc）を記録
+    # tracemalloc は実行を大きく遅くするため、時間の計測とは別に
+    # もう1回実行してピークメモリを測る
+    # pages を指定した段階（描画・書き出し）は、1ページあたりの時間（ミリ秒）も記録
+
+    def __init__(self, n_targets, n_models, trace_memory=True):
+        self.n_targets = n_targets
+        self.n_models = n_models
+        self.trace_memory = trace_memory
+        self.rows = []
+
+    def run(self, stage, func, *args, pages=None, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+
+        peak_mb = float('nan')
+        if self.trace_memory:
+            tracemalloc.start()
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peak_mb = peak / 2**20
+
+        self.rows.append(
+            {
+                'targets': self.n_targets,
+                'models': self.n_models,
+                'stage': stage,
+                'seconds': round(seconds, 4),
+                'peak_mb': round(peak_mb, 2),
+                'pages': pages,
+                'ms_per_page': (
+                    round(seconds * 1000 / pages, 2) if pages else None
+                ),
+            }
+        )
+        per_page = (
+            f"  {pages:>6} pages {seconds * 1000 / pages:9.1f} ms/page"
+            if pages
+            else ''
+        )
+        print(
+            f"{self.n_targets:>7} targets {self.n_models:>4} models  "
+            f"{stage:<17} {seconds:9.3f} s  {peak_mb:9.1f} MB{per_page}"
+        )
+        return result
+
+
+def render_bar_page(item):
+    target, df = item
+    return _bar_template().update(df, f'RMSE Comparison for {target}', 'RMSE')
+
+
+def render_epoch_page(item):
+    target, subset = item
+    return _epoch_template().update(
+        subset['epochs'],
+        [subset['val_rmse'], subset['test_rmse']],
+        f"RMSE vs NN Training Epochs for {target}",
+        'RMSE',
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _bar_template():
+    return BarPageTemplate()
+
+
+@functools.lru_cache(maxsize=None)
+def _epoch_template():
+    return LinePageTemplate(
+        "Epochs (log scale)", ['Validation RMSE', 'Test RMSE'], xscale='log'
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _complexity_template():
+    return LinePageTemplate(
+        "Complexity", ["Interpolation RMSE", "Extrapolation RMSE"]
+    )
+
+
+def render_complexity_page(item):
+    target, df = item
+    return _complexity_template().update(
+        df["Complexity"],
+        [df["Sqrt_Loss"], df["Range2_RMSE"]],
+        f"Complexity vs RMSE for {target}",
+        'RMSE',
+    )
+
+
+def _load_complexity(paths, targets):
+    # draw_plot.py と同じ前処理（√Loss、Complexity >= 10）
+    items = []
+    for target, path in zip(targets, paths):
+        df = read_csv_cached(
+            path,
+            usecols=["Complexity", "Loss", "Range2_RMSE"],
+            filters=[("Complexity", ">=", 10)],
+        )
+        df["Sqrt_Loss"] = np.sqrt(df["Loss"])
+        items.append((target, df))
+    return items
+
+
+def _load_cold(csv_files, data_dir):
+    # 列指向キャッシュを消してから読み込む（CSVの解析とキャッシュ作成を計測）
+    shutil.rmtree(os.path.join(data_dir, CACHE_DIR_NAME), ignore_errors=True)
+    return load_rmse_tables(csv_files)
+
+
+def _render_to_bytes(render_page, items, fmt):
+    pages = []
+    for item in items:
+        buf = io.BytesIO()
+        render_page(item).savefig(buf, format=fmt)
+        pages.append(buf.getvalue())
+    return pages
+
+
+def _normalize_all(values, errors, models):
+    return [
+        normalize_rmse(values, errors, mode, models=models)
+        for mode in NORMALIZATION_MODES
+    ]
+
+
+def _write_combine(module, values, errors, models, targets, pdf_path, args):
+    # write_report はモジュールの targets を使うため、計測中だけ合成データのtargetにする
+    saved_targets = module.targets
+    module.targets = targets
+    try:
+        module.write_report(
+            values,
+            errors,
+            models,
+            pdf_path,
+            targets_per_panel=args.targets_per_panel,
+            panels_per_page=args.panels_per_page,
+        )
+    finally:
+        module.targets = saved_targets
+
+
+def run_case(work_dir, n_targets, n_models, args, rng):
+    timer = StageTimer(n_targets, n_models, trace_memory=not args.no_memory)
+    data_dir = os.path.join(work_dir, f"t{n_targets}_m{n_models}")
+    os.makedirs(data_dir, exist_ok=True)
+    models = model_names(n_models)
+    targets = target_names(n_targets)
+    # 1ページずつの描画・書き出しを計測するtarget（0の場合はすべて）
+    sample = targets[: args.render_targets or None]
+
+    # 合成データの作成（計測対象外）
+    csv_files = write_rmse_statistics(data_dir, models, targets, rng)
+    epoch_path = write_epoch_results(data_dir, targets, rng)
+    complexity_paths = write_complexity_results(
+        data_dir, sample, args.complexity_points, rng
+    )
+
+    # 読み込み（初回はCSVの解析、2回目は列指向キャッシュ）
+    timer.run('load', _load_cold, csv_files, data_dir)
+    tables = timer.run('load_cached', load_rmse_tables, csv_files)
+
+    # 集計（fold平均と target ごとの分割）
+    grouped = timer.run(
+        'aggregate',
+        aggregate_epoch_means,
+        epoch_path,
+        ['val_rmse', 'test_rmse', 'val_r2', 'test_r2'],
+    )
+    parts = timer.run('split', split_by_target, grouped)
+
+    # 正規化（全モード）
+    values, errors = timer.run('build_arrays', tables.arrays, models, targets)
+    timer.run('normalize', _normalize_all, values, errors, models)
+
+    # 全targetを描く正規化RMSEのグラフ（内挿・外挿の2組のページ）
+    n_pages = 2 * len(
+        panel_pages(n_targets, args.targets_per_panel, args.panels_per_page)
+    )
+    for stage_name, module in COMBINE_STAGES.items():
+        norm_values, norm_errors = normalize_rmse(
+            values, errors, module.normalization_mode, models=models
+        )
+        timer.run(
+            stage_name,
+            _write_combine,
+            module,
+            norm_values,
+            norm_errors,
+            models,
+            targets,
+            os.path.join(data_dir, f"{stage_name}.pdf"),
+            args,
+            pages=n_pages,
+        )
+
+    # 描画（サンプルのtargetのみ、1ページずつPDF/PNGのバイト列に）
+    bar_items = [
+        (target, tables.target_frame(target, models)) for target in sample
+    ]
+    timer.run(
+        'render_bars',
+        _render_to_bytes,
+        render_bar_page,
+        bar_items,
+        'pdf',
+        pages=len(bar_items),
+    )
+    epoch_items = parts[: len(sample)]
+    timer.run(
+        'render_epochs',
+        _render_to_bytes,
+        render_epoch_page,
+        epoch_items,
+        'pdf',
+        pages=len(epoch_items),
+    )
+
+    complexity_items = timer.run(
+        'load_complexity', _load_complexity, complexity_paths, sample
+    )
+    timer.run(
+        'render_complexity',
+        _render_to_bytes,
+        render_complexity_page,
+        complexity_items,
+        'pdf',
+        pages=len(complexity_items),
+    )
+
+    # 書き出し（複数ページPDFとPNGのPDF化）
+    pdf_path = os.path.join(data_dir, 'rmse_all.pdf')
+    timer.run(
+        'write_pdf',
+        render_pdf,
+        render_bar_page,
+        bar_items,
+        pdf_path,
+        pages=len(bar_items),
+    )
+    png_paths = []
+    for target, data in zip(
+        sample, _render_to_bytes(render_bar_page, bar_items, 'png')
+    ):
+        path = os.path.join(data_dir, f"rmse_{target}.png")
+        with open(path, 'wb') as f:
+            f.write(data)
+        png_paths.append(path)
+    timer.run(
+        'write_png_pdf',
+        pack_combined,
+        png_paths,
+        os.path.join(data_dir, 'rmse_all_images.pdf'),
+        pages=len(png_paths),
+    )
+
+    if not args.keep_data:
+        shutil.rmtree(data_dir)
+    return timer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="合成データでレポート処理の各段階の時間とメモリを計測します"
+    )
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--targets', type=int, nargs='+', default=None)
+    parser.add_argument('--models', type=int, nargs='+', default=None)
+    parser.add_argument(
+        '--render-targets',
+        type=int_at_least(0),
+        default=20,
+        help="1ページずつの描画・書き出しを計測するtarget数（0の場合はすべて）",
+    )
+    # 正規化RMSEのグラフ（write_combine*）のパネル分割（省略時は全targetを1つに描く）
+    add_panel_arguments(parser)
+    parser.add_argument(
+        '--complexity-points',
+        type=int,
+        default=1000,
+        help="error_results_{target}.csv の行数",
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=None)
+    parser.add_argument('--keep-data', action='store_true')
+    parser.add_argument(
+        '--no-memory',
+        action='store_true',
+        help="ピークメモリを計測しない（各段階を1回だけ実行）",
+    )
+    parser.add_argument(
+        '--output', default=None, help="結果を書き出すCSVファイル"
+    )
+    args = parser.parse_args()
+
+    preset = PRESETS[args.preset]
+    target_sizes = args.targets or preset['targets']
+    model_sizes = args.models or preset['models']
+    for n_models in model_sizes:
+        if n_models < 3:
+            parser.error("--models must be at least 3 (LR, NN, SR)")
+
+    rng = np.random.default_rng(args.seed)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='bench_report_')
+    rows = []
+    try:
+        for n_targets in target_sizes:
+            for n_models in model_sizes:
+                rows.extend(run_case(work_dir, n_targets, n_models, args, rng))
+    finally:
+        if args.work_dir is None and not args.keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Saved benchmark results in: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
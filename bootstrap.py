@@ -0,0 +1,133 @@
+import argparse
+
+import numpy as np
+from plot_common import int_at_least
+
+# --- fold ごとの結果の平均に対するブートストラップ信頼区間 ---
+# グループ（(target, epochs) や (model, target)）ごとに fold の値を復元抽出して平均を取り、
+# その分布の分位点を信頼区間とする（パーセンタイル法）
+# 全グループの復元抽出は (復元抽出の回数 × 行数) の添字行列でまとめて行い、
+# Python のループは行数の上限ごとに区切ったグループのブロック単位でだけ回す
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+# 1回にまとめて作る添字行列の要素数の上限（メモリ使用量を抑えるため）
+MAX_BATCH_ELEMENTS = 1 << 22
+# 信頼区間の列名（'{指標}_ci_low' / '{指標}_ci_high'）
+CI_LOW = '_ci_low'
+CI_HIGH = '_ci_high'
+
+
+def confidence_level(value):
+    # argparse の type に渡す、0より大きく1より小さい信頼水準だけを受け付ける変換関数
+    level = float(value)
+    if not 0 < level < 1:
+        raise argparse.ArgumentTypeError(
+            f"must be a number between 0 and 1 (exclusive): {value}"
+        )
+    return level
+
+
+def add_bootstrap_arguments(parser):
+    parser.add_argument(
+        '--bootstrap',
+        type=int_at_least(0),
+        default=0,
+        metavar='N',
+        help="foldの平均の信頼区間を復元抽出N回のブートストラップで求めて描く"
+        "（0の場合は描かない）",
+    )
+    parser.add_argument(
+        '--confidence',
+        type=confidence_level,
+        default=DEFAULT_CONFIDENCE,
+        help="信頼区間の信頼水準",
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help="復元抽出の乱数のシード（指定すると同じ信頼区間を再現できる）",
+    )
+
+
+def bootstrap_mean_ci(
+    values,
+    sizes,
+    n_resamples=DEFAULT_RESAMPLES,
+    confidence=DEFAULT_CONFIDENCE,
+    rng=None,
+):
+    # values はグループ順に並べた1次元配列、sizes は各グループの行数
+    # 各グループの平均の信頼区間 (lower, upper) を返す（行がないグループはNaN）
+    values = np.asarray(values, dtype=float)
+    sizes = np.asarray(sizes, dtype=np.int64)
+    if rng is None:
+        rng = np.random.default_rng()
+    n_groups = len(sizes)
+    lower = np.full(n_groups, np.nan)
+    upper = np.full(n_groups, np.nan)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+    rows_per_batch = max(1, MAX_BATCH_ELEMENTS // n_resamples)
+
+    start = 0
+    while start < n_groups:
+        # 行数の合計が rows_per_batch に収まるグループをまとめる（最低1グループ）
+        stop = np.searchsorted(
+            offsets, offsets[start] + rows_per_batch, side='right'
+        )
+        stop = min(max(stop - 1, start + 1), n_groups)
+        block_sizes = sizes[start:stop]
+        block_starts = offsets[start:stop] - offsets[start]
+        nonempty = block_sizes > 0
+        if nonempty.any():
+            # 各行を、同じグループの中から一様に選んだ行で置き換える添字行列
+            group_of_row = np.repeat(np.arange(stop - start), block_sizes)
+            picks = rng.random((n_resamples, len(group_of_row)))
+            index = block_starts[group_of_row] + (
+                picks * block_sizes[group_of_row]
+            ).astype(np.int64)
+            samples = values[offsets[start] : offsets[stop]][index]
+            # グループごとの合計（行はグループ順に並んでいる）→ 平均
+            means = np.add.reduceat(
+                samples, block_starts[nonempty], axis=1
+            ) / (block_sizes[nonempty])
+            low, high = np.quantile(means, quantiles, axis=0)
+            lower[start:stop][nonempty] = low
+            upper[start:stop][nonempty] = high
+        start = stop
+    return lower, upper
+
+
+def bootstrap_group_ci(
+    df,
+    keys,
+    metrics,
+    n_resamples=DEFAULT_RESAMPLES,
+    confidence=DEFAULT_CONFIDENCE,
+    seed=None,
+):
+    # df（fold ごとの行）の keys ごとに、各指標の fold の平均の信頼区間を求める
+    # keys と '{指標}_ci_low' / '{指標}_ci_high' の列のDataFrameを返す（keys 順）
+    # NaN の値は除く（groupby().mean() と同じ）
+    rng = np.random.default_rng(seed)
+    grouped = df.groupby(keys, sort=True)
+    # キーがNaNの行は groupby で除かれ、ngroup が NaN になるため -1 にする
+    codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.intp)
+    result = grouped.size().index.to_frame(index=False)
+    n_groups = len(result)
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype=float)
+        # 値がNaNの行と、キーがNaNの行（codes が -1）を除く
+        valid = ~np.isnan(values) & (codes >= 0)
+        order = np.argsort(codes[valid], kind='stable')
+        lower, upper = bootstrap_mean_ci(
+            values[valid][order],
+            np.bincount(codes[valid], minlength=n_groups),
+            n_resamples=n_resamples,
+            confidence=confidence,
+            rng=rng,
+        )
+        result[metric + CI_LOW] = lower
+        result[metric + CI_HIGH] = upper
+    return result
@@ -0,0 +1,190 @@
+import argparse
+import functools
+import os
+
+from page_cache import (
+    evict_lru,
+    hash_file,
+    hash_parts,
+    load_arrays,
+    load_page,
+    page_cache_dir,
+    render_fingerprint,
+    store_arrays,
+    store_page,
+)
+from plot_common import add_panel_arguments
+from profiling import add_profile_argument, setup_profiling, stage
+from rmse_data import load_rmse_tables
+from rmse_normalize import NORMALIZATION_MODES, normalize_rmse
+
+# --- 正規化RMSEの棒グラフ（draw_all_combine*）のキャッシュ ---
+# (入力CSVの内容, モデル, target, 正規化の方法) をキーに正規化済みの配列を、
+# さらに描画関数とスタイルのソースを加えたキーで描画済みのPDFを保存する
+# モデルの組や正規化の方法だけを変えた再実行は、以前の結果をそのまま使う
+# キャッシュ全体が上限を超えたら、使われていない順（LRU）に削除する
+ARRAY_DIR_NAME = 'normalized'
+DEFAULT_CACHE_MAX_MB = 512
+
+
+def add_cache_arguments(parser, cache_dir=True):
+    # cache_dir=False の場合は --cache-max-mb のみ（--cache-dir は他で定義済み）
+    if cache_dir:
+        parser.add_argument(
+            '--cache-dir',
+            default=None,
+            help="正規化済みの配列と描画済みのPDFのキャッシュ先",
+        )
+    parser.add_argument(
+        '--cache-max-mb',
+        type=float,
+        default=DEFAULT_CACHE_MAX_MB,
+        help="キャッシュの上限（MB、超えたら古いものから削除）",
+    )
+
+
+def normalized_key(csv_files, models, targets, mode):
+    # 入力CSVの内容と、モデル・target・正規化の方法のハッシュ
+    file_hashes = [
+        f"{model}={hash_file(csv_files[model]) or ''}" for model in models
+    ]
+    return hash_parts(
+        ','.join(file_hashes), ','.join(models), ','.join(targets), mode
+    )
+
+
+def compute_normalized(csv_files, models, targets, mode):
+    # 選んだモデルのCSVだけを読み込んで正規化
+    with stage('load'):
+        tables = load_rmse_tables(
+            {model: csv_files[model] for model in models}
+        )
+    with stage('build_arrays'):
+        values, errors = tables.arrays(models, targets)
+    with stage('normalize'):
+        return normalize_rmse(values, errors, mode, models=models)
+
+
+def cached_normalized(key, compute, cache_dir=None):
+    # 正規化済みの (model × target × {inter, extra}) の配列
+    # （key（normalized_key）でキャッシュにあれば読み込み、
+    # なければ compute() で計算して保存）
+    if cache_dir is None:
+        return compute()
+    cache_path = os.path.join(cache_dir, ARRAY_DIR_NAME)
+    os.makedirs(cache_path, exist_ok=True)
+    arrays = load_arrays(cache_path, key)
+    if arrays is not None:
+        return arrays['values'], arrays['errors']
+    values, errors = compute()
+    store_arrays(cache_path, key, values=values, errors=errors)
+    return values, errors
+
+
+def write_cached_report(
+    write_report,
+    pdf_path,
+    key,
+    load_inputs,
+    cache_dir=None,
+    max_mb=DEFAULT_CACHE_MAX_MB,
+):
+    # write_report(*load_inputs(), pdf_path) で作成するPDFを、
+    # key（入力のハッシュ）と描画関数・スタイルのソースのハッシュで保存
+    # キャッシュにある場合は load_inputs も write_report も呼ばずにコピーする
+    if cache_dir is None:
+        write_report(*load_inputs(), pdf_path)
+        return
+
+    cache_path = page_cache_dir(cache_dir, pdf_path)
+    page_key = hash_parts(key, render_fingerprint(write_report))
+    data = load_page(cache_path, page_key)
+    if data is not None:
+        with open(pdf_path, 'wb') as f:
+            f.write(data)
+        print(f"Reused cached graphs in: {pdf_path}")
+    else:
+        write_report(*load_inputs(), pdf_path)
+        with open(pdf_path, 'rb') as f:
+            store_page(cache_path, page_key, f.read())
+    evict_lru(cache_dir, int(max_mb * 2**20))
+
+
+def write_normalized_report(
+    write_report,
+    csv_files,
+    models,
+    targets,
+    mode,
+    pdf_path,
+    cache_dir=None,
+    max_mb=DEFAULT_CACHE_MAX_MB,
+):
+    # draw_all_combine* の main から使う：正規化と描画をキャッシュ付きで実行
+    key = normalized_key(csv_files, models, targets, mode)
+
+    def load_inputs():
+        values, errors = cached_normalized(
+            key,
+            lambda: compute_normalized(csv_files, models, targets, mode),
+            cache_dir=cache_dir,
+        )
+        return values, errors, models
+
+    write_cached_report(
+        write_report,
+        pdf_path,
+        key,
+        load_inputs,
+        cache_dir=cache_dir,
+        max_mb=max_mb,
+    )
+
+
+def run_combine_script(module, description):
+    # draw_all_combine* の main：module の csv_files / targets / save_dir /
+    # pdf_names / normalization_mode / write_report を使ってPDFを作成
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--models',
+        nargs='+',
+        choices=list(module.csv_files),
+        default=list(module.csv_files),
+        help="描画するモデル（省略時はすべて）",
+    )
+    parser.add_argument(
+        '--mode',
+        choices=NORMALIZATION_MODES,
+        default=module.normalization_mode,
+        help="正規化の方法（PDFのファイル名とタイトルも方法ごとに変わる）",
+    )
+    add_panel_arguments(parser)
+    add_cache_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_profiling(args)
+
+    if args.mode == 'lr_baseline' and 'LR' not in args.models:
+        # 基準のLRを選んでいない場合は、正規化せずに描画する（係数1）
+        print("Warning: LR is not selected - RMSE values are not normalized")
+
+    os.makedirs(module.save_dir, exist_ok=True)  # フォルダがない場合は作成
+
+    # --- CSVの読み込み・正規化 → グラフ描画 & PDF出力 ---
+    # --cache-dir 指定時は、同じ入力・モデル・正規化方法の配列と
+    # 描画済みのPDFを再利用する（パネル・ページの分け方もキーに含める）
+    write_normalized_report(
+        functools.partial(
+            module.write_report,
+            mode=args.mode,
+            targets_per_panel=args.targets_per_panel,
+            panels_per_page=args.panels_per_page,
+        ),
+        module.csv_files,
+        args.models,
+        module.targets,
+        args.mode,
+        os.path.join(module.save_dir, module.pdf_names[args.mode]),
+        cache_dir=args.cache_dir,
+        max_mb=args.cache_max_mb,
+    )
@@ -0,0 +1,214 @@
+import argparse
+import functools
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from atomic_file import atomic_write
+
+# --- Complexity と RMSE の統合ストア ---
+# targetごとの error_results_{target}.csv を1つのファイルにまとめる
+# （targetごとに連続した行、各target内は Complexity 順、Sqrt_Loss は計算済み）
+# 行は (Complexity, Sqrt_Loss, Range2_RMSE) の構造化配列（.npy）として保存し、
+# target → 行の範囲 の索引（.json）と合わせて使う
+# 読み込み時は .npy をメモリマップし、targetの行の範囲だけを読む
+# （CSVを開いて解析するのはストアの作成時のみ）
+# .npy と .json はそれぞれ置き換えで書き込むため、索引には書き込んだ .npy の
+# サイズと更新時刻を記録し、開くときに一致しなければ（片方だけが新しい場合）使わない
+STORE_SUFFIX = '.npy'
+INDEX_SUFFIX = '.json'
+SOURCE_COLUMNS = ['Complexity', 'Loss', 'Range2_RMSE']
+STORE_DTYPE = np.dtype(
+    [
+        ('Complexity', 'f8'),
+        ('Sqrt_Loss', 'f8'),
+        ('Range2_RMSE', 'f8'),
+    ]
+)
+
+
+def add_store_argument(parser):
+    parser.add_argument(
+        '--store',
+        default=None,
+        help="complexity_store.py で作成した統合ストア（拡張子なし、"
+        "指定時はtargetごとのCSVを読まない）",
+    )
+
+
+def _source_signature(path):
+    # ファイルのサイズと更新時刻（元のCSVが変わっていなければ再読み込みしない）
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def _read_source(csv_path):
+    # CSVを読み込み、Sqrt_Loss を計算して Complexity 順に並べる
+    # （同じ Complexity の行は元の順番のまま）
+    df = pd.read_csv(csv_path, usecols=SOURCE_COLUMNS)
+    df = df.sort_values('Complexity', kind='mergesort')
+    rows = np.empty(len(df), dtype=STORE_DTYPE)
+    rows['Complexity'] = df['Complexity'].to_numpy(dtype=float)
+    rows['Sqrt_Loss'] = np.sqrt(df['Loss'].to_numpy(dtype=float))
+    rows['Range2_RMSE'] = df['Range2_RMSE'].to_numpy(dtype=float)
+    return rows
+
+
+def _write_atomic(path, write):
+    with atomic_write(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+
+
+def build_store(store_path, results_path, targets):
+    # results_path（'{target}' を含むCSVのパス）の各targetを store_path にまとめる
+    # 既存のストアがあれば、元のCSVが変わっていないtargetはストアの行をそのまま使う
+    # CSVがないtargetはストアに含めない（描画時に飛ばされる）
+    old = open_store.__wrapped__(store_path)
+    parts = []
+    index = {}
+    start = 0
+    for target in targets:
+        csv_path = results_path.format(target=target)
+        try:
+            source = _source_signature(csv_path)
+        except FileNotFoundError:
+            print(f"Warning: File not found - {csv_path}")
+            continue
+        if old is not None and old.source(target) == source:
+            rows = np.array(old.rows(target))
+        else:
+            rows = _read_source(csv_path)
+        parts.append(rows)
+        index[target] = {
+            'start': start,
+            'stop': start + len(rows),
+            'source': source,
+            'digest': hashlib.sha256(rows.tobytes()).hexdigest(),
+        }
+        start += len(rows)
+
+    data = np.concatenate(parts) if parts else np.empty(0, dtype=STORE_DTYPE)
+    data_path = store_path + STORE_SUFFIX
+    _write_atomic(data_path, lambda f: np.save(f, data))
+    # 置き換えた .npy（書き込んだファイルそのもの）のサイズと更新時刻を索引に記録
+    header = {
+        'rows': len(data),
+        'data': _source_signature(data_path),
+        'targets': index,
+    }
+    _write_atomic(
+        store_path + INDEX_SUFFIX,
+        lambda f: f.write(json.dumps(header).encode('utf-8')),
+    )
+    return len(index)
+
+
+class ComplexityStore:
+    # 統合ストアの読み込み（.npy はメモリマップし、必要な行だけを読む）
+
+    def __init__(self, store_path):
+        with open(store_path + INDEX_SUFFIX, encoding='utf-8') as f:
+            index = json.load(f)
+        data_path = store_path + STORE_SUFFIX
+        # 索引と .npy が同じ書き込みのものか（作成の途中で止まっていないか）
+        if index.get('data') != _source_signature(data_path):
+            raise ValueError(f"Inconsistent complexity store - {store_path}")
+        self.data = np.load(data_path, mmap_mode='r')
+        if self.data.dtype != STORE_DTYPE or len(self.data) != index['rows']:
+            raise ValueError(f"Inconsistent complexity store - {store_path}")
+        self.index = index['targets']
+
+    def __contains__(self, target):
+        return target in self.index
+
+    def source(self, target):
+        entry = self.index.get(target)
+        return None if entry is None else entry['source']
+
+    def digest(self, target):
+        # targetの行の内容のハッシュ（ページキャッシュのキーに使う）
+        entry = self.index.get(target)
+        return None if entry is None else entry['digest']
+
+    def rows(self, target):
+        # targetの行（メモリマップのスライス、コピーしない）
+        entry = self.index[target]
+        return self.data[entry['start'] : entry['stop']]
+
+    def load(self, target, min_complexity=None):
+        # targetの (Complexity, Sqrt_Loss, Range2_RMSE) のDataFrame
+        # Complexity 順に並んでいるので、min_complexity 未満の行は二分探索で除く
+        # （Complexity が NaN の行は末尾に並んでいるので、これも除く）
+        # ストアにないtargetは KeyError
+        rows = self.rows(target)
+        if min_complexity is not None:
+            complexity = rows['Complexity']
+            first = np.searchsorted(complexity, min_complexity)
+            stop = np.searchsorted(complexity, np.inf, side='right')
+            rows = rows[first:stop]
+        return pd.DataFrame(
+            {name: np.array(rows[name]) for name in STORE_DTYPE.names}
+        )
+
+    def frame(self, targets=None, min_complexity=None):
+        # 複数のtargetの行をまとめた 'target' 列付きのDataFrame（ストアの並び順）
+        # targets が None の場合はストアのすべてのtarget
+        names = list(self.index) if targets is None else targets
+        entries = [(t, self.index[t]) for t in names if t in self.index]
+        lengths = [entry['stop'] - entry['start'] for _, entry in entries]
+        rows = np.concatenate(
+            [np.arange(e['start'], e['stop']) for _, e in entries]
+            or [np.empty(0, dtype=np.int64)]
+        )
+        data = self.data[rows]
+        df = pd.DataFrame({name: data[name] for name in STORE_DTYPE.names})
+        df.insert(0, 'target', np.repeat([t for t, _ in entries], lengths))
+        if min_complexity is not None:
+            df = df[df['Complexity'] >= min_complexity].reset_index(drop=True)
+        return df
+
+
+@functools.lru_cache(maxsize=None)
+def open_store(store_path):
+    # プロセスごとに1回だけ開く（ストアがない・壊れている場合は None）
+    try:
+        return ComplexityStore(store_path)
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Warning: Could not read complexity store - {e}")
+        return None
+
+
+def main():
+    # 既定のパスとtargetは draw_plot.py と同じ
+    from draw_plot import error_results_path, target_columns
+
+    parser = argparse.ArgumentParser(
+        description="targetごとの error_results_{target}.csv を1つのストアにまとめます"
+    )
+    parser.add_argument(
+        'store',
+        help="作成するストアのパス（拡張子なし、.npy と .json を作成）",
+    )
+    parser.add_argument(
+        '--results-path',
+        default=error_results_path,
+        help="targetごとのCSVのパス（'{target}' を含む）",
+    )
+    parser.add_argument(
+        '--targets',
+        nargs='+',
+        default=target_columns,
+        help="まとめるtarget（省略時は draw_plot.py のすべてのtarget）",
+    )
+    args = parser.parse_args()
+
+    n_targets = build_store(args.store, args.results_path, args.targets)
+    print(f"Saved {n_targets} targets in: {args.store}{STORE_SUFFIX}")
+
+
+if __name__ == '__main__':
+    main()
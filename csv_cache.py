@@ -0,0 +1,279 @@
+import glob
+import operator
+import os
+
+import numpy as np
+import pandas as pd
+from atomic_file import atomic_write
+
+# --- CSVの列指向キャッシュ ---
+# 初回の読み込み時にCSVをParquetに変換して保存し、2回目以降は
+# 元のCSVのサイズと更新時刻が変わっていなければParquetから必要な列だけを読む
+# pyarrow がない環境では通常の pd.read_csv にフォールバックする
+CACHE_DIR_NAME = '.csv_cache'
+CACHE_SUFFIX = '.parquet'
+# Parquetの行グループの行数（行グループごとの最小・最大値で読み飛ばす単位）
+ROW_GROUP_SIZE = 100_000
+
+# --- 読み込み時の行の絞り込み（filters） ---
+# [(列, 演算子, 値), ...] のリストで、すべての条件を満たす行だけを読み込む
+# 演算子は pyarrow と同じ '==', '!=', '<', '<=', '>', '>=', 'in', 'not in'
+# Parquetからは条件に合わない行グループを読み飛ばし、CSVはチャンクごとに絞り込む
+# （メモリ使用量はファイルサイズではなく、残る行数に比例する）
+# 値がNaNの行は、どの比較でも残らない（pyarrow と同じ）
+FILTER_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _has_parquet_engine():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def cache_path_for(csv_path, cache_dir=None):
+    # キャッシュファイル名に元のCSVのサイズと更新時刻を含める
+    stat = os.stat(csv_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(csv_path), CACHE_DIR_NAME)
+    name = os.path.basename(csv_path)
+    return os.path.join(
+        cache_dir, f"{name}.{stat.st_size}-{stat.st_mtime_ns}{CACHE_SUFFIX}"
+    )
+
+
+def _remove_stale(cache_path):
+    # 同じCSVの古いキャッシュを削除
+    name = os.path.basename(cache_path).rsplit('.', 2)[0]
+    pattern = os.path.join(
+        glob.escape(os.path.dirname(cache_path)), f"{glob.escape(name)}.*"
+    )
+    for path in glob.glob(pattern + CACHE_SUFFIX):
+        if path != cache_path:
+            os.remove(path)
+
+
+class _CacheNotWritten(Exception):
+    pass
+
+
+def _cached_chunks(csv_path, cache_path, chunksize=1_000_000):
+    # CSVを全列でチャンクごとに読み込みながら、同じチャンクをParquetに書き出す
+    # （全体をメモリに載せない）。最後まで読み終えたときだけキャッシュを置き換える
+    # 列の型は最初のチャンクに合わせる（後のチャンクで欠損が現れた整数の列は
+    # 欠損を含むまま保存できる）
+    # 書き込めない場所や、Parquetに変換できない列がある場合は、
+    # キャッシュを作らずにチャンクだけを返す（pyarrow の ArrowInvalid などは ValueError の派生）
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        with atomic_write(cache_path) as tmp_path:
+            error = None
+            writer = None
+            try:
+                with pd.read_csv(csv_path, chunksize=chunksize) as reader:
+                    for chunk in reader:
+                        if error is None:
+                            try:
+                                if writer is None:
+                                    os.makedirs(
+                                        os.path.dirname(cache_path),
+                                        exist_ok=True,
+                                    )
+                                schema = (
+                                    None if writer is None else writer.schema
+                                )
+                                table = pa.Table.from_pandas(
+                                    chunk, schema=schema, preserve_index=False
+                                )
+                                if writer is None:
+                                    writer = pq.ParquetWriter(
+                                        tmp_path, table.schema
+                                    )
+                                writer.write_table(
+                                    table, row_group_size=ROW_GROUP_SIZE
+                                )
+                            except (OSError, TypeError, ValueError) as e:
+                                error = e
+                        yield chunk
+                if error is None:
+                    try:
+                        if writer is None:
+                            # 行のないCSVは列名だけのParquetにする
+                            os.makedirs(
+                                os.path.dirname(cache_path), exist_ok=True
+                            )
+                            pd.read_csv(csv_path, nrows=0).to_parquet(
+                                tmp_path, index=False
+                            )
+                        else:
+                            writer.close()
+                            writer = None
+                    except (OSError, TypeError, ValueError) as e:
+                        error = e
+            finally:
+                if writer is not None:
+                    writer.close()
+            if error is not None:
+                # 一時ファイルを削除し、キャッシュを置き換えない
+                raise _CacheNotWritten(error)
+    except _CacheNotWritten as e:
+        _warn_not_cached(cache_path, e)
+    else:
+        _remove_stale(cache_path)
+
+
+def _warn_not_cached(cache_path, error):
+    print(f"Warning: Could not write CSV cache - {cache_path} ({error})")
+
+
+def _select_columns(df, usecols):
+    # 存在する列だけを指定の順番で返す
+    if usecols is None:
+        return df
+    return df[[column for column in usecols if column in df.columns]]
+
+
+def filter_rows(df, filters):
+    # filters のすべての条件を満たす行だけを返す
+    if not filters:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        values = df[column]
+        if op == 'in':
+            mask &= values.isin(value).to_numpy()
+        elif op == 'not in':
+            mask &= (~values.isin(value) & values.notna()).to_numpy()
+        else:
+            mask &= (
+                FILTER_OPERATORS[op](values, value) & values.notna()
+            ).to_numpy()
+    return df[mask]
+
+
+def _filter_expression(filters):
+    # filters を pyarrow の式に変換
+    # pyarrow の 'not in' は欠損の行を残すため、filter_rows と同じく除く
+    if not filters:
+        return None
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    expression = pq.filters_to_expression(filters)
+    for column, op, _ in filters:
+        if op == 'not in':
+            expression &= pc.field(column).is_valid()
+    return expression
+
+
+def _read_columns(usecols, filters):
+    # CSVから読む列（使う列と、絞り込みの条件に使う列）
+    if usecols is None:
+        return None
+    wanted = set(usecols)
+    wanted.update(column for column, _, _ in filters or ())
+    return lambda c: c in wanted
+
+
+def _read_csv_filtered(csv_path, usecols, filters, chunksize=1_000_000):
+    # チャンクごとに絞り込みながら読み込む（条件に合わない行は保持しない）
+    chunks = [
+        _select_columns(filter_rows(chunk, filters), usecols)
+        for chunk in pd.read_csv(
+            csv_path,
+            usecols=_read_columns(usecols, filters),
+            chunksize=chunksize,
+        )
+    ]
+    if not chunks:
+        return _select_columns(pd.read_csv(csv_path, nrows=0), usecols)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_csv_cached(csv_path, usecols=None, cache_dir=None, filters=None):
+    # usecols に指定した列のうち、CSVに存在する列だけを読み込む
+    # （SRのように分散列を持たないファイルでもエラーにしない）
+    # filters を指定すると、条件を満たす行だけを読み込む
+    if not _has_parquet_engine():
+        if filters:
+            return _read_csv_filtered(csv_path, usecols, filters)
+        if usecols is None:
+            return pd.read_csv(csv_path)
+        return _select_columns(
+            pd.read_csv(csv_path, usecols=_read_columns(usecols, None)),
+            usecols,
+        )
+
+    cache_path = cache_path_for(csv_path, cache_dir=cache_dir)
+    if not os.path.exists(cache_path):
+        # 初回はチャンクごとにキャッシュを作成してから、必要な列と行だけを読む
+        for _ in _cached_chunks(csv_path, cache_path):
+            pass
+        if not os.path.exists(cache_path):
+            # キャッシュを作れなかった場合はCSVのまま使う
+            return _read_csv_filtered(csv_path, usecols, filters)
+
+    # 条件に合わない行グループは読み飛ばす
+    expression = _filter_expression(filters)
+    if usecols is None:
+        return pd.read_parquet(cache_path, filters=expression)
+    import pyarrow.parquet as pq
+
+    names = pq.read_schema(cache_path).names
+    columns = [column for column in usecols if column in names]
+    return pd.read_parquet(cache_path, columns=columns, filters=expression)
+
+
+def iter_csv_chunks(
+    csv_path, usecols, chunksize=1_000_000, cache_dir=None, filters=None
+):
+    # CSVを一定行数ずつ読み込む（全体をメモリに載せない）
+    # 有効な列指向キャッシュがあれば、そこから必要な列だけをバッチで読む
+    # （filters 指定時は、条件に合わない行グループを読み飛ばす）
+    # キャッシュがなければ、CSVを読みながら同じチャンクでキャッシュを作成する
+    if _has_parquet_engine():
+        cache_path = cache_path_for(csv_path, cache_dir=cache_dir)
+        if os.path.exists(cache_path):
+            import pyarrow.dataset as ds
+
+            dataset = ds.dataset(cache_path, format='parquet')
+            names = dataset.schema.names
+            columns = [column for column in usecols if column in names]
+            expression = _filter_expression(filters)
+            for batch in dataset.to_batches(
+                columns=columns, filter=expression, batch_size=chunksize
+            ):
+                if batch.num_rows:
+                    yield batch.to_pandas()
+            return
+        chunks = _cached_chunks(csv_path, cache_path, chunksize=chunksize)
+    else:
+        chunks = _csv_chunks(csv_path, usecols, filters, chunksize)
+    # 途中で読むのをやめた場合も、作りかけのキャッシュをすぐに削除する
+    try:
+        for chunk in chunks:
+            chunk = _select_columns(filter_rows(chunk, filters), usecols)
+            if len(chunk):
+                yield chunk
+    finally:
+        chunks.close()
+
+
+def _csv_chunks(csv_path, usecols, filters, chunksize):
+    # 使う列と、絞り込みの条件に使う列だけをチャンクごとに読み込む
+    with pd.read_csv(
+        csv_path,
+        usecols=_read_columns(usecols, filters),
+        chunksize=chunksize,
+    ) as reader:
+        yield from reader
@@ -0,0 +1,53 @@
+import numpy as np
+
+# --- 密な曲線の間引き ---
+# x軸を等幅のバケット（ピクセル列に相当）に分け、各バケットのyの最小値と
+# 最大値の点だけを残す（min/max decimation）
+# 各バケット内の上下の包絡線は保たれるため、間引き後も見た目はほぼ変わらない
+
+# 間引き後の点数の下限（最初と最後の点と、1つのバケットの最小・最大の点）
+MIN_POINTS = 4
+
+
+def minmax_decimate(x, y, max_points, log_x=False):
+    # 点数が max_points 以下になるように (x, y) を間引く
+    # 有限でない点は除き、元の x の順に並べて返す
+    # log_x=True の場合は対数軸上で等幅のバケットに分ける（x > 0 の点のみ）
+    if max_points is not None and max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be >= {MIN_POINTS}")
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if log_x:
+        finite &= x > 0
+    x = x[finite]
+    y = y[finite]
+    if max_points is None or len(x) <= max_points:
+        return x, y
+
+    order = np.argsort(x, kind='stable')
+    x = x[order]
+    y = y[order]
+    position = np.log10(x) if log_x else x
+
+    # 最初と最後の点は必ず残すため、バケット数は (max_points - 2) / 2
+    n_buckets = max(1, (max_points - 2) // 2)
+    span = position[-1] - position[0]
+    if span > 0:
+        buckets = ((position - position[0]) / span * n_buckets).astype(int)
+        buckets = np.minimum(buckets, n_buckets - 1)
+    else:
+        buckets = np.zeros(len(x), dtype=int)
+
+    # (バケット, y) の順に並べ、各バケットの先頭が最小値、末尾が最大値
+    by_value = np.lexsort((y, buckets))
+    sorted_buckets = buckets[by_value]
+    first = np.flatnonzero(
+        np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]]
+    )
+    last = np.r_[first[1:] - 1, len(by_value) - 1]
+
+    keep = np.unique(
+        np.concatenate(([0, len(x) - 1], by_value[first], by_value[last]))
+    )
+    return x[keep], y[keep]
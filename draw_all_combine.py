@@ -1,8 +1,13 @@
-import matplotlib.pyplot as plt
-import pandas as pd
 import numpy as np
-import os
-from matplotlib.backends.backend_pdf import PdfPages
+import sys
+from combine_cache import run_combine_script
+from plot_common import (
+    is_paginated,
+    panel_pages,
+    render_panel_pages,
+    shared_ylim,
+)
+from rmse_normalize import to_series_dict
 
 # --- CSVファイルのパス定義 ---
 csv_files = {
@@ -31,96 +36,43 @@ targets = list(rmse_units.keys())
 
 # --- 保存先フォルダの指定 ---
 save_dir = "/Users/sshunsuke/Downloads/"
-os.makedirs(save_dir, exist_ok=True)
-
-# --- 各CSVファイルの読み込み ---
-dfs = {}
-for model, file_path in csv_files.items():
-    dfs[model] = pd.read_csv(file_path)
-
-# --- 各モデル・RMSEタイプごとの正規化済み値およびエラーデータを格納する辞書の初期化 ---
-# 内挿（Inter）と外挿（Extra）をそれぞれ独立に扱います。
-series_data = {}
-error_data = {}
-models = list(csv_files.keys())
-for model in models:
-    series_data[f"{model}_Inter"] = []  # 内挿の正規化済みRMSE
-    series_data[f"{model}_Extra"] = []  # 外挿の正規化済みRMSE
-    error_data[f"{model}_Inter"] = []  # 内挿のエラーデータ
-    error_data[f"{model}_Extra"] = []  # 外挿のエラーデータ
-
-# --- 各targetごとに内挿と外挿を個別に正規化 ---
-for target in targets:
-    temp_data = (
-        {}
-    )  # 各モデルの元の値を一時保存 (inter, inter_err, extra, extra_err)
-    inter_values = []  # 内挿のRMSE値を集めるリスト
-    extra_values = []  # 外挿のRMSE値を集めるリスト
-
-    for model in models:
-        df = dfs[model]
-        target_data = df[df['target'] == target]
-        if not target_data.empty:
-            # 内挿値
-            inter = target_data['val_rmse_mean'].values[0]
-            # 外挿値
-            extra = target_data['test_rmse_mean'].values[0]
-            # モデルSRはエラーバーなし（0）とする
-            if model == 'SR':
-                inter_err = 0
-                extra_err = 0
-            else:
-                inter_err = np.sqrt(target_data['val_rmse_variance'].values[0])
-                extra_err = np.sqrt(
-                    target_data['test_rmse_variance'].values[0]
-                )
-            temp_data[model] = (inter, inter_err, extra, extra_err)
-            inter_values.append(inter)
-            extra_values.append(extra)
-        else:
-            temp_data[model] = None
-
-    # 内挿と外挿で正規化に用いる各target内の最大値を個別に算出
-    if inter_values:
-        norm_factor_inter = max(inter_values)
-        if norm_factor_inter == 0:
-            norm_factor_inter = 1
-    else:
-        norm_factor_inter = 1
-
-    if extra_values:
-        norm_factor_extra = max(extra_values)
-        if norm_factor_extra == 0:
-            norm_factor_extra = 1
-    else:
-        norm_factor_extra = 1
-
-    # 各モデルごとに正規化した値を格納
-    for model in models:
-        if temp_data[model] is not None:
-            inter, inter_err, extra, extra_err = temp_data[model]
-            norm_inter = inter / norm_factor_inter
-            norm_extra = extra / norm_factor_extra
-            norm_inter_err = inter_err / norm_factor_inter
-            norm_extra_err = extra_err / norm_factor_extra
-        else:
-            norm_inter = np.nan
-            norm_extra = np.nan
-            norm_inter_err = np.nan
-            norm_extra_err = np.nan
-
-        series_data[f"{model}_Inter"].append(norm_inter)
-        series_data[f"{model}_Extra"].append(norm_extra)
-        error_data[f"{model}_Inter"].append(norm_inter_err)
-        error_data[f"{model}_Extra"].append(norm_extra_err)
-
-# --- グラフ描画 & PDF出力 ---
-pdf_path = os.path.join(save_dir, "rmse_normalized_separate_norm.pdf")
-with PdfPages(pdf_path) as pdf:
-
-    # 【内挿（Interpolation）のグラフ】
-    fig, ax = plt.subplots(figsize=(16, 10))
-    x = np.arange(len(targets))  # 各targetのx軸位置
+
+# --- 正規化の方法（既定）と、方法ごとの出力するPDFのファイル名・タイトルの表記 ---
+# 既定では各targetごとに内挿と外挿を個別に正規化（各target内の最大値で割る）
+normalization_mode = 'max_separate'
+pdf_names = {
+    'max_separate': "rmse_normalized_separate_norm.pdf",
+    'max_both': "rmse_normalized_max_both.pdf",
+    'lr_baseline': "rmse_normalized_lr_based.pdf",
+}
+title_suffixes = {
+    'max_separate': '',
+    'max_both': ' (max-based)',
+    'lr_baseline': ' (LR-based)',
+}
+
+
+def write_report(
+    norm_values,
+    norm_errors,
+    models,
+    pdf_path,
+    mode=normalization_mode,
+    targets_per_panel=None,
+    panels_per_page=1,
+):
+    # 正規化済みの (model × target × {inter, extra}) の配列からグラフを描画し、PDFに保存
+    # targets_per_panel を指定すると、targetをその数ずつのパネルに分け、
+    # panels_per_page 個ずつのページに並べる（y軸の範囲は全パネルで共通）
+    # matplotlib は描画するときに読み込む（起動を軽くするため）
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    title_suffix = title_suffixes[mode]
+
+    # --- 描画用に "{model}_Inter" / "{model}_Extra" をキーにした辞書に変換 ---
+    series_data = to_series_dict(norm_values, models)
+    error_data = to_series_dict(norm_errors, models)
+
     n_models = len(models)
     bar_width = 0.2
     # 各target内にモデルごとの棒を中央に配置するためのオフセットを設定
@@ -129,55 +81,54 @@ with PdfPages(pdf_path) as pdf:
     # モデルごとの色設定
     model_colors = {'LR': 'red', 'NN': 'blue', 'SR': 'green'}
 
-    for i, model in enumerate(models):
-        pos = x + offsets[i]
-        ax.bar(
-            pos,
-            series_data[f"{model}_Inter"],
-            width=bar_width,
-            yerr=error_data[f"{model}_Inter"],
-            label=model,
-            color=model_colors.get(model, 'gray'),
-            capsize=5,
-        )
-
-    ax.set_xlabel('Target', fontsize=20)
-    ax.set_ylabel('Normalized RMSE (Interpolation)', fontsize=20)
-    ax.set_title('Normalized RMSE Comparison - Interpolation', fontsize=24)
-    ax.set_xticks(x)
-    ax.set_xticklabels(targets, rotation=45, fontsize=14)
-    ax.legend(fontsize=12)
-    ax.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    pdf.savefig(fig)
-    plt.close(fig)
-
-    # 【外挿（Extrapolation）のグラフ】
-    fig, ax = plt.subplots(figsize=(16, 10))
-    x = np.arange(len(targets))
-    offsets = [(i - (n_models - 1) / 2) * bar_width for i in range(n_models)]
-
-    for i, model in enumerate(models):
-        pos = x + offsets[i]
-        ax.bar(
-            pos,
-            series_data[f"{model}_Extra"],
-            width=bar_width,
-            yerr=error_data[f"{model}_Extra"],
-            label=model,
-            color=model_colors.get(model, 'gray'),
-            capsize=5,
-        )
-
-    ax.set_xlabel('Target', fontsize=20)
-    ax.set_ylabel('Normalized RMSE (Extrapolation)', fontsize=20)
-    ax.set_title('Normalized RMSE Comparison - Extrapolation', fontsize=24)
-    ax.set_xticks(x)
-    ax.set_xticklabels(targets, rotation=45, fontsize=14)
-    ax.legend(fontsize=12)
-    ax.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    pdf.savefig(fig)
-    plt.close(fig)
-
-print(f"Saved separate normalized graphs in: {pdf_path}")
+    pages = panel_pages(len(targets), targets_per_panel, panels_per_page)
+
+    # --- グラフ描画 & PDF出力 ---
+    # 内挿（Interpolation）→ 外挿（Extrapolation）の順に、それぞれのページを描画
+    with PdfPages(pdf_path) as pdf:
+        for k, (rmse_type, label) in enumerate(
+            [('Inter', 'Interpolation'), ('Extra', 'Extrapolation')]
+        ):
+
+            def draw_panel(ax, panel):
+                x = np.arange(panel.stop - panel.start)  # 各targetのx軸位置
+                for i, model in enumerate(models):
+                    key = f"{model}_{rmse_type}"
+                    ax.bar(
+                        x + offsets[i],
+                        series_data[key][panel],
+                        width=bar_width,
+                        yerr=error_data[key][panel],
+                        label=model,
+                        color=model_colors.get(model, 'gray'),
+                        capsize=5,
+                    )
+                ax.set_ylabel(f'Normalized RMSE ({label})', fontsize=20)
+                ax.set_xticks(x)
+                ax.set_xticklabels(targets[panel], rotation=45, fontsize=14)
+                ax.grid(True, linestyle='--', alpha=0.7)
+
+            # 内挿・外挿はそれぞれ個別に正規化しているため、y軸の範囲も個別に共通化
+            ylim = None
+            if is_paginated(pages):
+                ylim = shared_ylim(norm_values[..., k], norm_errors[..., k])
+            render_panel_pages(
+                pdf,
+                pages,
+                draw_panel,
+                f'Normalized RMSE Comparison - {label}{title_suffix}',
+                ylim=ylim,
+            )
+
+    print(f"Saved normalized graphs{title_suffix} in: {pdf_path}")
+
+
+def main():
+    run_combine_script(
+        sys.modules[__name__],
+        "内挿・外挿を個別に正規化したRMSEの棒グラフをPDFに保存します",
+    )
+
+
+if __name__ == '__main__':
+    main()
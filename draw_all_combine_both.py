@@ -1,8 +1,13 @@
-import matplotlib.pyplot as plt
-import pandas as pd
 import numpy as np
-import os
-from matplotlib.backends.backend_pdf import PdfPages
+import sys
+from combine_cache import run_combine_script
+from plot_common import (
+    is_paginated,
+    panel_pages,
+    render_panel_pages,
+    shared_ylim,
+)
+from rmse_normalize import to_series_dict
 
 # --- CSVファイルのパス定義 ---
 csv_files = {
@@ -31,131 +36,109 @@ targets = list(rmse_units.keys())
 
 # --- 保存先フォルダの指定 ---
 save_dir = "/Users/sshunsuke/Downloads/"
-os.makedirs(save_dir, exist_ok=True)
-
-# --- CSVファイルの読み込み ---
-dfs = {}
-for model, file_path in csv_files.items():
-    dfs[model] = pd.read_csv(file_path)
-
-# --- 各モデル・RMSEタイプごとの正規化済み値およびエラーデータを格納する辞書の初期化 ---
-# 各モデルについて、"Inter"（Interpolation）と"Extra"（Extrapolation）の2系列を作成
-series_data = {}
-error_data = {}
-models = list(csv_files.keys())
-for model in models:
-    series_data[f"{model}_Inter"] = []
-    series_data[f"{model}_Extra"] = []
-    error_data[f"{model}_Inter"] = []
-    error_data[f"{model}_Extra"] = []
-
-# --- 各targetごとに正規化（対象内の最大RMSE値で割る） ---
-for target in targets:
-    temp_data = {}  # 各モデルの値を一時保存
-    values = []  # 正規化のため、全モデルのRMSE値を収集
-    for model in models:
-        df = dfs[model]
-        target_data = df[df['target'] == target]
-        if not target_data.empty:
-            inter = target_data['val_rmse_mean'].values[0]
-            extra = target_data['test_rmse_mean'].values[0]
-            # モデルSRはエラーバーなし（=0）とする
-            if model == 'SR':
-                inter_err = 0
-                extra_err = 0
-            else:
-                inter_err = np.sqrt(target_data['val_rmse_variance'].values[0])
-                extra_err = np.sqrt(
-                    target_data['test_rmse_variance'].values[0]
+
+# --- 正規化の方法（既定）と、方法ごとの出力するPDFのファイル名・タイトルの表記 ---
+# 既定では各targetごとに正規化（対象内の最大RMSE値で割る）
+normalization_mode = 'max_both'
+pdf_names = {
+    'max_both': "rmse_normalized_bar.pdf",
+    'max_separate': "rmse_normalized_bar_separate_norm.pdf",
+    'lr_baseline': "rmse_normalized_bar_lr_based.pdf",
+}
+title_suffixes = {
+    'max_both': '',
+    'max_separate': ' (separate)',
+    'lr_baseline': ' (LR-based)',
+}
+
+
+def write_report(
+    norm_values,
+    norm_errors,
+    models,
+    pdf_path,
+    mode=normalization_mode,
+    targets_per_panel=None,
+    panels_per_page=1,
+):
+    # 正規化済みの (model × target × {inter, extra}) の配列からグラフを描画し、PDFに保存
+    # targets_per_panel を指定すると、targetをその数ずつのパネルに分け、
+    # panels_per_page 個ずつのページに並べる（y軸の範囲は全パネルで共通）
+    # matplotlib は描画するときに読み込む（起動を軽くするため）
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    title_suffix = title_suffixes[mode]
+
+    # --- 描画用に "{model}_Inter" / "{model}_Extra" をキーにした辞書に変換 ---
+    series_data = to_series_dict(norm_values, models)
+    error_data = to_series_dict(norm_errors, models)
+
+    # 各target内に表示する棒の本数：モデルごとにInterpolationとExtrapolationの2本→合計6本
+    n_bars = len(models) * 2
+    bar_width = 0.12
+    # 棒をx軸中心に集めるため、各棒のオフセットを計算
+    offsets = [(i - (n_bars - 1) / 2) * bar_width for i in range(n_bars)]
+
+    # 内挿と外挿で色を変えるための辞書を定義
+    colors_inter = {'LR': 'red', 'NN': 'blue', 'SR': 'green'}
+    colors_extra = {'LR': 'orange', 'NN': 'cyan', 'SR': 'lime'}
+
+    def draw_panel(ax, panel):
+        x = np.arange(panel.stop - panel.start)  # x軸：各targetの位置
+
+        # 各モデル・RMSEタイプの系列を順にプロット
+        bar_index = 0
+        for model in models:
+            for rmse_type, hatch in zip(['Inter', 'Extra'], ['/', '\\']):
+                key = f"{model}_{rmse_type}"
+                pos = x + offsets[bar_index]
+                # 内挿と外挿で異なる色を使用する
+                if rmse_type == 'Inter':
+                    color = colors_inter[model]
+                else:
+                    color = colors_extra[model]
+                ax.bar(
+                    pos,
+                    series_data[key][panel],
+                    width=bar_width,
+                    yerr=error_data[key][panel],
+                    color=color,
+                    capsize=5,
+                    hatch=hatch,
+                    label=f"{model} {'Interpolation' if rmse_type=='Inter' else 'Extrapolation'}",
                 )
-            temp_data[model] = (inter, inter_err, extra, extra_err)
-            values.extend([inter, extra])
-        else:
-            temp_data[model] = None
-    # そのtargetにおける最大RMSE値で正規化（万一0の場合は1に）
-    if values:
-        norm_factor = max(values)
-        if norm_factor == 0:
-            norm_factor = 1
-    else:
-        norm_factor = 1
-
-    # 各モデルごとの正規化済み値をシリーズに追加
-    for model in models:
-        if temp_data[model] is not None:
-            inter, inter_err, extra, extra_err = temp_data[model]
-            norm_inter = inter / norm_factor
-            norm_extra = extra / norm_factor
-            norm_inter_err = inter_err / norm_factor
-            norm_extra_err = extra_err / norm_factor
-        else:
-            norm_inter = np.nan
-            norm_extra = np.nan
-            norm_inter_err = np.nan
-            norm_extra_err = np.nan
-        series_data[f"{model}_Inter"].append(norm_inter)
-        series_data[f"{model}_Extra"].append(norm_extra)
-        error_data[f"{model}_Inter"].append(norm_inter_err)
-        error_data[f"{model}_Extra"].append(norm_extra_err)
-
-# --- 棒グラフの描画 ---
-fig, ax = plt.subplots(figsize=(16, 10))
-x = np.arange(len(targets))  # x軸：各targetの位置
-
-# 各target内に表示する棒の本数：モデルごとにInterpolationとExtrapolationの2本→合計6本
-n_bars = len(models) * 2
-bar_width = 0.12
-# 棒をx軸中心に集めるため、各棒のオフセットを計算
-offsets = [(i - (n_bars - 1) / 2) * bar_width for i in range(n_bars)]
-
-# 内挿と外挿で色を変えるための辞書を定義
-colors_inter = {'LR': 'red', 'NN': 'blue', 'SR': 'green'}
-colors_extra = {'LR': 'orange', 'NN': 'cyan', 'SR': 'lime'}
-
-# 各モデル・RMSEタイプの系列を順にプロット
-bar_index = 0
-for model in models:
-    for rmse_type, hatch in zip(['Inter', 'Extra'], ['/', '\\']):
-        key = f"{model}_{rmse_type}"
-        pos = x + offsets[bar_index]
-        # 内挿と外挿で異なる色を使用する
-        if rmse_type == 'Inter':
-            color = colors_inter[model]
-        else:
-            color = colors_extra[model]
-        ax.bar(
-            pos,
-            series_data[key],
-            width=bar_width,
-            yerr=error_data[key],
-            color=color,
-            capsize=5,
-            hatch=hatch,
-            label=f"{model} {'Interpolation' if rmse_type=='Inter' else 'Extrapolation'}",
+                bar_index += 1
+
+        ax.set_ylabel('Normalized RMSE', fontsize=20)
+        ax.set_xticks(x)
+        ax.set_xticklabels(targets[panel], rotation=45, fontsize=14)
+        ax.tick_params(axis='y', labelsize=14)
+        ax.grid(True, linestyle='--', alpha=0.7)
+
+    # --- 棒グラフの描画 & PDFに保存 ---
+    pages = panel_pages(len(targets), targets_per_panel, panels_per_page)
+    ylim = None
+    if is_paginated(pages):
+        ylim = shared_ylim(norm_values, norm_errors)
+    with PdfPages(pdf_path) as pdf:
+        render_panel_pages(
+            pdf,
+            pages,
+            draw_panel,
+            'Normalized RMSE Comparison Across Targets (Bar Graph)'
+            + title_suffix,
+            ylim=ylim,
         )
-        bar_index += 1
 
-ax.set_xlabel('Target', fontsize=20)
-ax.set_ylabel('Normalized RMSE', fontsize=20)
-ax.set_title(
-    'Normalized RMSE Comparison Across Targets (Bar Graph)', fontsize=24
-)
-ax.set_xticks(x)
-ax.set_xticklabels(targets, rotation=45, fontsize=14)
-ax.tick_params(axis='y', labelsize=14)
+    print(f"Saved normalized graphs{title_suffix} in: {pdf_path}")
 
-# 重複するラベルを除くために、一度辞書に格納してからlegendを設定
-handles, labels = ax.get_legend_handles_labels()
-by_label = dict(zip(labels, handles))
-ax.legend(by_label.values(), by_label.keys(), fontsize=12)
 
-ax.grid(True, linestyle='--', alpha=0.7)
-plt.tight_layout()
+def main():
+    run_combine_script(
+        sys.modules[__name__],
+        "内挿・外挿をまとめて正規化したRMSEの棒グラフをPDFに保存します",
+    )
 
-# --- PDFに保存 ---
-pdf_path = os.path.join(save_dir, "rmse_normalized_bar.pdf")
-with PdfPages(pdf_path) as pdf:
-    pdf.savefig(fig)
-plt.close(fig)
 
-print(f"Saved normalized RMSE bar graph in: {pdf_path}")
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,15 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-
+import argparse
+from complexity_store import add_store_argument, open_store
+from csv_cache import read_csv_cached
+from decimate import minmax_decimate
+from plot_common import (
+    add_batch_arguments,
+    add_decimation_arguments,
+    finish_figure,
+    use_headless_backend,
+)
+from profiling import add_profile_argument, setup_profiling, stage
 
 # ターゲット列のリスト
 target_columns = [
@@ -18,31 +26,50 @@ target_columns = [
     'Tm',
 ]
 
-for target in target_columns:
-    # CSVファイルを読み込む（ファイル名を適宜変更してください）
-    file_path = f"/Users/sshunsuke/Downloads/error_results_{target}.csv"  # CSVファイルのパス
-    df = pd.read_csv(file_path)
-
-    # Lossの平方根を計算
-    df["Sqrt_Loss"] = np.sqrt(df["Loss"])
-    df = df[df["Complexity"] >= 10]
-
-    # グラフをプロット
-    plt.figure(figsize=(10, 6))
-    plt.plot(
-        df["Complexity"],
-        df["Sqrt_Loss"],
-        marker="o",
-        label="interpolation RMSE",
-        markersize=5,
-    )
-    plt.plot(
-        df["Complexity"],
-        df["Range2_RMSE"],
-        marker="o",
-        label="extrapolation RMSE",
-        markersize=5,
-    )
+
+def draw_target(target, max_points=None, rasterized=False, store_path=None):
+    # pyplot は描画するときに読み込む（--headless では先にAggに切り替える）
+    import matplotlib.pyplot as plt
+
+    if store_path is not None:
+        # 統合ストアからtargetの行だけを読む（Sqrt_Loss は計算済み）
+        store = open_store(store_path)
+        if store is None:
+            raise FileNotFoundError(2, "No such file", store_path)
+        with stage('load_csv', target=target):
+            df = store.load(target, min_complexity=10)
+    else:
+        # CSVファイルを読み込む（ファイル名を適宜変更してください）
+        file_path = f"/Users/sshunsuke/Downloads/error_results_{target}.csv"  # CSVファイルのパス
+        # 使う列と Complexity >= 10 の行のみ、2回目以降は列指向キャッシュから
+        with stage('load_csv', target=target):
+            df = read_csv_cached(
+                file_path,
+                usecols=["Complexity", "Loss", "Range2_RMSE"],
+                filters=[("Complexity", ">=", 10)],
+            )
+
+        # Lossの平方根を計算
+        df["Sqrt_Loss"] = np.sqrt(df["Loss"])
+
+    # グラフをプロット（max_points 指定時は間引き、rasterized 時は線のみラスタ化）
+    fig = plt.figure(figsize=(10, 6))
+    for column, label in [
+        ("Sqrt_Loss", "interpolation RMSE"),
+        ("Range2_RMSE", "extrapolation RMSE"),
+    ]:
+        x = df["Complexity"]
+        y = df[column]
+        if max_points is not None:
+            x, y = minmax_decimate(x, y, max_points)
+        plt.plot(
+            x,
+            y,
+            marker="o",
+            label=label,
+            markersize=5,
+            rasterized=rasterized,
+        )
 
     # ラベルとタイトルを追加
     plt.xlabel("Complexity")
@@ -52,11 +79,40 @@ for target in target_columns:
     )
     plt.legend()
     plt.grid()
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ComplexityとRMSEの関係をtargetごとに保存します"
+    )
+    add_batch_arguments(parser)
+    add_decimation_arguments(parser)
+    add_store_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_profiling(args)
+
+    # --headless の場合は画面表示せず、全targetを続けてファイルに書き出す
+    if args.headless:
+        use_headless_backend()
+
+    for target in target_columns:
+        with stage('render_page', target=target):
+            try:
+                fig = draw_target(
+                    target, args.max_points, args.rasterize, args.store
+                )
+            except FileNotFoundError as e:
+                # 無人実行でも止まらないよう、ファイルがないtargetは飛ばす
+                print(f"Warning: File not found - {e.filename}")
+                continue
+            except KeyError:
+                print(f"Warning: Target not found in store - {target}")
+                continue
+            # グラフを保存（表示後はFigureを閉じてメモリを解放）
+            finish_figure(fig, args, f"Complexity_vs_RMSE_{target}")
 
-    # グラフを保存
-    output_path = f"./Complexity_vs_RMSE_{target}.png"  # 保存先のパス
-    plt.savefig(output_path, dpi=300, bbox_inches="tight")
-    print(f"Graph saved as: {output_path}")
 
-    # グラフを表示
-    plt.show()
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,108 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+from bootstrap import CI_HIGH, CI_LOW, add_bootstrap_arguments
+from epoch_data import (
+    add_epoch_filter_arguments,
+    add_epoch_ci,
+    aggregate_epoch_means,
+    epoch_filters,
+    split_by_target,
+)
+from plot_common import (
+    add_batch_arguments,
+    finish_figure,
+    use_headless_backend,
+)
+from profiling import add_profile_argument, setup_profiling, stage
 
-# CSVファイルを読み込みます
+# CSVファイルのパス
 file_path = '/Users/sshunsuke/Downloads/results_epochs_evaluation.csv'  # 実際のファイルパスに置き換えてください
-data = pd.read_csv(file_path)
-
-# 各 target と epochs において fold の平均を計算します
-grouped = data.groupby(['target', 'epochs']).mean().reset_index()
-
-# 各 target についてプロットを作成
-plt.figure(figsize=(12, 8))
-
-targets = grouped['target'].unique()
-for target in targets:
-    subset = grouped[grouped['target'] == target]
-    plt.plot(
-        subset['epochs'],
-        subset['val_r2'],
-        label=f'Validation R² (Target: {target})',
-        marker='o',
-    )
-    plt.plot(
-        subset['epochs'],
-        subset['test_r2'],
-        label=f'Test R² (Target: {target})',
-        linestyle='--',
-        marker='o',
+
+
+def draw_all_targets(grouped):
+    # pyplot は描画するときに読み込む（--headless では先にAggに切り替える）
+    import matplotlib.pyplot as plt
+
+    # 各 target についてプロットを作成
+    fig = plt.figure(figsize=(12, 8))
+
+    # 集計結果は target 順に並んでいるので、1回の走査で target ごとに分割
+    for target, subset in split_by_target(grouped):
+        val_line = plt.plot(
+            subset['epochs'],
+            subset['val_r2'],
+            label=f'Validation R² (Target: {target})',
+            marker='o',
+        )[0]
+        test_line = plt.plot(
+            subset['epochs'],
+            subset['test_r2'],
+            label=f'Test R² (Target: {target})',
+            linestyle='--',
+            marker='o',
+        )[0]
+        # --bootstrap の場合は、foldの平均の信頼区間を線と同じ色の帯で描く
+        if 'val_r2' + CI_LOW in subset.columns:
+            for metric, line in [('val_r2', val_line), ('test_r2', test_line)]:
+                plt.fill_between(
+                    subset['epochs'],
+                    subset[metric + CI_LOW],
+                    subset[metric + CI_HIGH],
+                    color=line.get_color(),
+                    alpha=0.2,
+                    linewidth=0,
+                )
+
+    # グラフの設定
+    plt.xscale('log')  # エポック数を対数スケールに
+    plt.xlabel('Epochs (log scale)')
+    plt.ylabel('R²')
+    plt.title('R² vs Epochs for All Targets')
+    plt.legend(loc='best')
+    plt.grid(True)
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="全targetのR²とエポック数の関係を描画します"
     )
+    add_batch_arguments(parser, default_output_dir=None)
+    add_epoch_filter_arguments(parser)
+    add_bootstrap_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_profiling(args)
+
+    # --headless の場合は画面表示せず、ファイルへの保存のみ行う
+    if args.headless:
+        use_headless_backend()
+
+    # 各 target と epochs において fold の平均を計算します
+    # （CSVをチャンクごとに読み込み、使う指標の合計と件数のみを保持）
+    # --targets / --min-epochs / --max-epochs に合わない行は読み込み時に除く
+    filters = epoch_filters(args.targets, args.min_epochs, args.max_epochs)
+    with stage('aggregate'):
+        grouped = aggregate_epoch_means(
+            file_path, ['val_r2', 'test_r2'], filters=filters
+        )
+    if args.bootstrap > 0:
+        # 全 (target, epochs) の信頼区間を一括の復元抽出で計算
+        with stage('bootstrap'):
+            grouped = add_epoch_ci(
+                grouped,
+                file_path,
+                ['val_r2', 'test_r2'],
+                n_resamples=args.bootstrap,
+                confidence=args.confidence,
+                seed=args.seed,
+                filters=filters,
+            )
+
+    # グラフを保存・表示
+    with stage('render_page'):
+        fig = draw_all_targets(grouped)
+    finish_figure(fig, args, "r2_epochs_all_targets")
 
-# グラフの設定
-plt.xscale('log')  # エポック数を対数スケールに
-plt.xlabel('Epochs (log scale)')
-plt.ylabel('R²')
-plt.title('R² vs Epochs for All Targets')
-plt.legend(loc='best')
-plt.grid(True)
 
-# グラフを表示
-plt.show()
+if __name__ == '__main__':
+    main()
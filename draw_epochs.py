@@ -1,7 +1,18 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+import functools
 import os
-from matplotlib.backends.backend_pdf import PdfPages  # PDF出力用
+from bootstrap import CI_HIGH, CI_LOW, add_bootstrap_arguments
+from epoch_data import (
+    add_epoch_filter_arguments,
+    add_epoch_ci,
+    aggregate_epoch_means,
+    epoch_filters,
+    split_by_target,
+)
+from page_cache import frame_page_key
+from parallel_render import add_render_arguments, render_pdf
+from plot_common import LinePageTemplate, add_decimation_arguments
+from profiling import add_profile_argument, setup_profiling, stage
 
 # RMSEの単位を定義
 rmse_units = {
@@ -21,74 +32,129 @@ rmse_units = {
 # CSVファイルのパス
 file_path = '/Users/sshunsuke/Downloads/results_epochs_evaluation.csv'
 
+# グラフに使う指標
+epoch_metrics = ['val_rmse', 'test_rmse']
+
 # **保存先フォルダを指定**
 save_dir = "/Users/sshunsuke/Downloads/rmse_epochs_graphs"
-os.makedirs(save_dir, exist_ok=True)  # フォルダがない場合は作成
 
-# **1つのPDFファイルにまとめて保存**
-pdf_path = os.path.join(save_dir, "rmse_epochs_all_targets.pdf")
-with PdfPages(pdf_path) as pdf:
-    try:
-        # CSVファイルを読み込み
-        data = pd.read_csv(file_path)
+# 出力するPDFのファイル名
+pdf_name = "rmse_epochs_all_targets.pdf"
+
+
+@functools.lru_cache(maxsize=None)
+def page_template(max_points=None, rasterized=False):
+    # 全targetで使い回すページのひな形（x軸は対数スケール、プロセスごとに1回だけ作成）
+    return LinePageTemplate(
+        "Epochs (log scale)",
+        ['Validation RMSE', 'Test RMSE'],
+        xscale='log',
+        max_points=max_points,
+        rasterized=rasterized,
+    )
+
+
+def render_target_page(item, max_points=None, rasterized=False):
+    target, subset = item
+
+    # --bootstrap の場合は、foldの平均の信頼区間を帯で描く
+    bands = None
+    if 'val_rmse' + CI_LOW in subset.columns:
+        bands = [
+            (subset[metric + CI_LOW], subset[metric + CI_HIGH])
+            for metric in ['val_rmse', 'test_rmse']
+        ]
+
+    # グラフの描画（ひな形の線のデータ・タイトル・単位だけを差し替え）
+    return page_template(max_points, rasterized).update(
+        subset['epochs'],
+        [subset['val_rmse'], subset['test_rmse']],
+        f"RMSE vs NN Training Epochs for {target}",
+        f"RMSE [{rmse_units.get(target, '')}]",  # 単位を追加
+        bands=bands,
+    )
+
+
+def write_report(
+    grouped,
+    pdf_path,
+    jobs=1,
+    cache_dir=None,
+    max_points=None,
+    rasterized=False,
+):
+    # 各 target についてプロットを作成し、1つのPDFにまとめて保存
+    # （集計結果は target 順に並んでいるので、1回の走査で target ごとに分割）
+    with stage('split'):
+        items = split_by_target(grouped)
+    # --max-points / --rasterize の設定はワーカーにも渡す
+    render_page = functools.partial(
+        render_target_page,
+        max_points=max_points,
+        rasterized=rasterized,
+    )
+    with stage('render_pdf'):
+        render_pdf(
+            render_page,
+            items,
+            pdf_path,
+            jobs=jobs,
+            cache_dir=cache_dir,
+            page_key=frame_page_key,
+        )
+
+    print(f"Saved all graphs in: {pdf_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="エポック数とRMSEの関係を1つのPDFにまとめて保存します"
+    )
+    add_render_arguments(parser)
+    add_decimation_arguments(parser)
+    add_epoch_filter_arguments(parser)
+    add_bootstrap_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_profiling(args)
+
+    os.makedirs(save_dir, exist_ok=True)  # フォルダがない場合は作成
 
+    try:
         # 各 target と epochs において fold の平均を計算
-        grouped = data.groupby(['target', 'epochs']).mean().reset_index()
-
-        # 各 target についてプロットを作成
-        targets = grouped['target'].unique()
-
-        for target in targets:
-            subset = grouped[grouped['target'] == target]
-
-            # グラフの描画
-            fig, ax = plt.subplots(figsize=(12, 8))
-            ax.plot(
-                subset['epochs'],
-                subset['val_rmse'],
-                label='Validation RMSE',
-                marker='o',
-                markersize=8,
-            )
-            ax.plot(
-                subset['epochs'],
-                subset['test_rmse'],
-                label='Test RMSE',
-                marker='o',
-                markersize=8,
-            )
-
-            # x軸を対数スケールに設定
-            ax.set_xscale('log')
-
-            # ラベルとタイトル（フォントサイズを統一）
-            ax.set_xlabel("Epochs (log scale)", fontsize=24)
-            ax.set_ylabel(
-                f"RMSE [{rmse_units.get(target, '')}]", fontsize=24
-            )  # 単位を追加
-            ax.set_title(
-                f"RMSE vs NN Training Epochs for {target}", fontsize=28
-            )
-
-            # 軸の目盛りのフォントサイズを調整
-            ax.tick_params(axis="both", labelsize=22)
-
-            # y軸の目盛りを有効数字3桁で表示
-            ax.yaxis.set_major_formatter(
-                plt.FuncFormatter(lambda x, _: f'{x:.3g}')
+        # （CSVをチャンクごとに読み込み、使う指標の合計と件数のみを保持）
+        # --targets / --min-epochs / --max-epochs に合わない行は読み込み時に除く
+        filters = epoch_filters(args.targets, args.min_epochs, args.max_epochs)
+        with stage('aggregate'):
+            grouped = aggregate_epoch_means(
+                file_path, epoch_metrics, filters=filters
             )
+        if args.bootstrap > 0:
+            # 全 (target, epochs) の信頼区間を一括の復元抽出で計算
+            with stage('bootstrap'):
+                grouped = add_epoch_ci(
+                    grouped,
+                    file_path,
+                    epoch_metrics,
+                    n_resamples=args.bootstrap,
+                    confidence=args.confidence,
+                    seed=args.seed,
+                    filters=filters,
+                )
+    except FileNotFoundError:
+        print(f"Warning: File not found - {file_path}")
+        return
 
-            # 凡例とグリッドを設定
-            ax.legend(fontsize=22)
-            ax.grid(True, linestyle="--", alpha=0.7)
-
-            plt.tight_layout()
-
-            # **PDFに追加**
-            pdf.savefig(fig)  # PDFに現在のグラフを保存
-            plt.close(fig)  # メモリ解放
+    # **1つのPDFファイルにまとめて保存**
+    write_report(
+        grouped,
+        os.path.join(save_dir, pdf_name),
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+        max_points=args.max_points,
+        rasterized=args.rasterize,
+    )
 
-        print(f"Saved all graphs in: {pdf_path}")
 
-    except FileNotFoundError:
-        print(f"Warning: File not found - {file_path}")
+if __name__ == '__main__':
+    main()
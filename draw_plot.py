@@ -1,8 +1,17 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
+import argparse
+import functools
 import os
-from matplotlib.backends.backend_pdf import PdfPages  # PDF出力用
+from complexity_store import add_store_argument, open_store
+from csv_cache import read_csv_cached
+from page_cache import hash_file, hash_parts
+from parallel_render import (
+    add_prefetch_argument,
+    add_render_arguments,
+    render_pdf,
+)
+from plot_common import LinePageTemplate, add_decimation_arguments
+from profiling import add_profile_argument, setup_profiling, stage
 
 # RMSEの単位を定義
 rmse_units = {
@@ -24,72 +33,170 @@ target_columns = list(rmse_units.keys())
 
 # **保存先フォルダを指定**
 save_dir = "/Users/sshunsuke/Downloads/rmse_complexity_graphs"
-os.makedirs(save_dir, exist_ok=True)  # フォルダがない場合は作成
-
-# **1つのPDFファイルにまとめて保存**
-pdf_path = os.path.join(save_dir, "rmse_complexity_all.pdf")
-with PdfPages(pdf_path) as pdf:
-    # 各ターゲットについて処理
-    for target in target_columns:
-        # CSVファイルのパス
-        file_path = f"/Users/sshunsuke/Downloads/error_results_{target}.csv"
-
-        try:
-            # CSVを読み込む
-            df = pd.read_csv(file_path)
-
-            # Lossの平方根を計算し、新しい列を追加
-            df["Sqrt_Loss"] = np.sqrt(df["Loss"])
-
-            # Complexityが10以上のデータのみを使用
-            df = df[df["Complexity"] >= 10]
-
-            # グラフの描画
-            fig, ax = plt.subplots(figsize=(12, 8))
-            ax.plot(
-                df["Complexity"],
-                df["Sqrt_Loss"],
-                marker="o",
-                label="Interpolation RMSE",
-                markersize=8,
-            )
-            ax.plot(
-                df["Complexity"],
-                df["Range2_RMSE"],
-                marker="o",
-                label="Extrapolation RMSE",
-                markersize=8,
-            )
-
-            # ラベルとタイトル（フォントサイズを統一）
-            ax.set_xlabel("Complexity", fontsize=24)
-            ax.set_ylabel(
-                f"RMSE [{rmse_units[target]}]", fontsize=24
-            )  # 単位を追加
-            ax.set_title(
-                f"Complexity vs RMSE for {target}",
-                fontsize=28,
-            )
-
-            # 軸の目盛りのフォントサイズを調整
-            ax.tick_params(axis="both", labelsize=22)
-
-            # y軸の目盛りを有効数字3桁で表示
-            ax.yaxis.set_major_formatter(
-                plt.FuncFormatter(lambda x, _: f'{x:.3g}')
-            )
-
-            # 凡例とグリッドを設定
-            ax.legend(fontsize=22)
-            ax.grid(True, linestyle="--", alpha=0.7)
-
-            plt.tight_layout()
-
-            # **PDFに追加**
-            pdf.savefig(fig)  # PDFに現在のグラフを保存
-            plt.close(fig)  # メモリ解放
-
-        except FileNotFoundError:
-            print(f"Warning: File not found - {file_path}")
+
+# CSVファイルのパス
+error_results_path = "/Users/sshunsuke/Downloads/error_results_{target}.csv"
+
+# グラフに使う列
+complexity_columns = ["Complexity", "Loss", "Range2_RMSE"]
+
+# グラフに使う Complexity の下限
+min_complexity = 10
+
+# 出力するPDFのファイル名
+pdf_name = "rmse_complexity_all.pdf"
+
+
+def page_key(target, results_path=error_results_path, store_path=None):
+    # ページの入力（CSVファイルの内容、ストア使用時はストアの行）のハッシュ
+    if store_path is not None:
+        store = open_store(store_path)
+        file_hash = None if store is None else store.digest(target)
+    else:
+        file_hash = hash_file(results_path.format(target=target))
+    if file_hash is None:
+        return None
+    return hash_parts(target, file_hash)
+
+
+@functools.lru_cache(maxsize=None)
+def page_template(max_points=None, rasterized=False):
+    # 全targetで使い回すページのひな形（プロセスごとに1回だけ作成）
+    return LinePageTemplate(
+        "Complexity",
+        ["Interpolation RMSE", "Extrapolation RMSE"],
+        max_points=max_points,
+        rasterized=rasterized,
+    )
+
+
+def load_error_results(
+    target, results_path=error_results_path, store_path=None
+):
+    # Complexity と 内挿（Sqrt_Loss）・外挿RMSE を読み込む
+    # store_path 指定時は統合ストアからtargetの行だけを読む
+    # （Sqrt_Loss は計算済み、Complexity の下限は二分探索で適用）
+    if store_path is not None:
+        store = open_store(store_path)
+        if store is None:
+            raise FileNotFoundError(2, "No such file", store_path)
+        return store.load(target, min_complexity=min_complexity)
+
+    # CSVを読み込む（使う列と Complexity が下限以上の行のみ、
+    # 2回目以降は列指向キャッシュから条件に合う行グループだけを読む）
+    df = read_csv_cached(
+        results_path.format(target=target),
+        usecols=complexity_columns,
+        filters=[("Complexity", ">=", min_complexity)],
+    )
+
+    # Lossの平方根を計算し、新しい列を追加
+    df["Sqrt_Loss"] = np.sqrt(df["Loss"])
+    return df
+
+
+def render_target_page(
+    target,
+    load=None,
+    results_path=error_results_path,
+    max_points=None,
+    rasterized=False,
+    store_path=None,
+):
+    # CSVファイルのパス
+    file_path = results_path.format(target=target)
+
+    try:
+        # --prefetch の場合は先読みした結果を受け取る（読み込み中なら待つ）
+        with stage('load_csv', target=target):
+            if load is not None:
+                df = load()
+            else:
+                df = load_error_results(target, results_path, store_path)
+    except FileNotFoundError as e:
+        print(f"Warning: File not found - {e.filename or file_path}")
+        return None
+    except KeyError:
+        print(f"Warning: Target not found in store - {target}")
+        return None
+
+    # グラフの描画（ひな形の線のデータ・タイトル・単位だけを差し替え）
+    return page_template(max_points, rasterized).update(
+        df["Complexity"],
+        [df["Sqrt_Loss"], df["Range2_RMSE"]],
+        f"Complexity vs RMSE for {target}",
+        f"RMSE [{rmse_units[target]}]",  # 単位を追加
+    )
+
+
+def write_report(
+    pdf_path,
+    results_path=error_results_path,
+    jobs=1,
+    cache_dir=None,
+    max_points=None,
+    rasterized=False,
+    prefetch_depth=0,
+    store_path=None,
+):
+    # 各ターゲットを1ページずつ描画し、1つのPDFにまとめて保存
+    # prefetch_depth > 0 の場合、描画中に次のターゲットのCSVをスレッドで先読み
+    # store_path 指定時はtargetごとのCSVの代わりに統合ストアから読む
+    # CSVのパスと --max-points / --rasterize の設定はワーカーにも渡す
+    # （ストアはパスだけを渡し、各ワーカーで開く）
+    render_page = functools.partial(
+        render_target_page,
+        results_path=results_path,
+        max_points=max_points,
+        rasterized=rasterized,
+        store_path=store_path,
+    )
+    with stage('render_pdf'):
+        render_pdf(
+            render_page,
+            target_columns,
+            pdf_path,
+            jobs=jobs,
+            cache_dir=cache_dir,
+            page_key=functools.partial(
+                page_key, results_path=results_path, store_path=store_path
+            ),
+            prefetch=functools.partial(
+                load_error_results,
+                results_path=results_path,
+                store_path=store_path,
+            ),
+            prefetch_depth=prefetch_depth,
+        )
 
     print(f"Saved all graphs in: {pdf_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ComplexityとRMSEの関係を1つのPDFにまとめて保存します"
+    )
+    add_render_arguments(parser)
+    add_prefetch_argument(parser)
+    add_decimation_arguments(parser)
+    add_store_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    setup_profiling(args)
+
+    os.makedirs(save_dir, exist_ok=True)  # フォルダがない場合は作成
+
+    # **1つのPDFファイルにまとめて保存**（各ターゲットを1ページずつ描画）
+    write_report(
+        os.path.join(save_dir, pdf_name),
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+        max_points=args.max_points,
+        rasterized=args.rasterize,
+        prefetch_depth=args.prefetch,
+        store_path=args.store,
+    )
+
+
+if __name__ == '__main__':
+    main()
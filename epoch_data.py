@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from bootstrap import DEFAULT_CONFIDENCE, DEFAULT_RESAMPLES, bootstrap_group_ci
+from csv_cache import iter_csv_chunks, read_csv_cached
+
+# --- results_epochs_evaluation.csv の集計キーと指標 ---
+EPOCH_KEYS = ['target', 'epochs']
+EPOCH_METRICS = ['val_rmse', 'test_rmse', 'val_r2', 'test_r2']
+
+
+def add_epoch_filter_arguments(parser):
+    # 集計する target とエポック数の範囲（読み込み時に絞り込む）
+    parser.add_argument(
+        '--targets',
+        nargs='+',
+        default=None,
+        help="集計するtarget（省略時はすべて）",
+    )
+    parser.add_argument(
+        '--min-epochs', type=int, default=None, help="エポック数の下限"
+    )
+    parser.add_argument(
+        '--max-epochs', type=int, default=None, help="エポック数の上限"
+    )
+
+
+def epoch_filters(targets=None, min_epochs=None, max_epochs=None):
+    # aggregate_epoch_means の filters（csv_cache と同じ形式）
+    filters = []
+    if targets is not None:
+        filters.append(('target', 'in', list(targets)))
+    if min_epochs is not None:
+        filters.append(('epochs', '>=', min_epochs))
+    if max_epochs is not None:
+        filters.append(('epochs', '<=', max_epochs))
+    return filters
+
+
+def aggregate_epoch_means(
+    file_path, metrics, chunksize=1_000_000, filters=None
+):
+    # 各 target と epochs における fold の平均を、チャンクごとに読み込みながら計算
+    # 保持するのは (target, epochs) ごとの合計と件数のみなので、
+    # メモリ使用量はファイルサイズではなくグループ数に比例する
+    # filters（epoch_filters）を指定すると、条件に合う行だけを読み込んで集計する
+    # 列指向キャッシュがあればそこから読み、なければ読みながら作成する
+    # 結果は data.groupby(['target', 'epochs']).mean().reset_index() と同じ
+    sums = None
+    counts = None
+    for chunk in iter_csv_chunks(
+        file_path,
+        EPOCH_KEYS + list(metrics),
+        chunksize=chunksize,
+        filters=filters,
+    ):
+        grouped = chunk.groupby(EPOCH_KEYS)[list(metrics)]
+        chunk_sums = grouped.sum()
+        chunk_counts = grouped.count()
+        if sums is None:
+            sums = chunk_sums
+            counts = chunk_counts
+        else:
+            sums = sums.add(chunk_sums, fill_value=0)
+            counts = counts.add(chunk_counts, fill_value=0)
+
+    if sums is None:
+        return pd.DataFrame(columns=EPOCH_KEYS + list(metrics))
+    # NaNを除いた件数で割る（全てNaNのグループはNaNのまま）
+    means = sums / counts.where(counts > 0)
+    return means.sort_index().reset_index()
+
+
+def add_epoch_ci(
+    grouped,
+    file_path,
+    metrics,
+    n_resamples=DEFAULT_RESAMPLES,
+    confidence=DEFAULT_CONFIDENCE,
+    seed=None,
+    filters=None,
+):
+    # aggregate_epoch_means の結果に、各 target と epochs における
+    # fold の平均のブートストラップ信頼区間の列（'{指標}_ci_low' など）を加える
+    # 復元抽出には fold ごとの行が必要なので、使う列と条件に合う行だけを読み込む
+    # （キャッシュの作成も読み込みもチャンク単位で、CSV全体をメモリに載せない）
+    folds = read_csv_cached(
+        file_path, usecols=EPOCH_KEYS + list(metrics), filters=filters
+    )
+    ci = bootstrap_group_ci(
+        folds,
+        EPOCH_KEYS,
+        metrics,
+        n_resamples=n_resamples,
+        confidence=confidence,
+        seed=seed,
+    )
+    return grouped.merge(ci, on=EPOCH_KEYS, how='left')
+
+
+def split_by_target(grouped):
+    # target ごとに連続した行のスライス (target, subset) のリストを返す
+    # 行を1回走査して境界を求めるだけで、target ごとの比較やコピーは行わない
+    if not grouped['target'].is_monotonic_increasing:
+        grouped = grouped.sort_values('target', kind='stable')
+    values = grouped['target'].to_numpy()
+    if len(values) == 0:
+        return []
+    starts = np.flatnonzero(values[1:] != values[:-1]) + 1
+    bounds = np.concatenate(([0], starts, [len(values)]))
+    return [
+        (values[start], grouped.iloc[start:end])
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
@@ -0,0 +1,42 @@
+import os
+
+import pandas as pd
+from csv_cache import iter_csv_chunks
+
+# --- 入力CSVの検証（描画はせず、matplotlib も読み込まない） ---
+# ファイルの有無と必要な列（スキーマ）を確認し、target の網羅状況を調べる
+# 描画できない問題は errors、描画はできるが欠けがあるものは warnings に入れる
+
+
+def missing_columns(csv_path, required):
+    # ヘッダー行だけを読み、足りない列を返す
+    columns = set(pd.read_csv(csv_path, nrows=0).columns)
+    return [column for column in required if column not in columns]
+
+
+def csv_targets(csv_path, chunksize=1_000_000):
+    # target 列だけをチャンクごとに読み、含まれる target の集合を返す
+    found = set()
+    for chunk in iter_csv_chunks(csv_path, ['target'], chunksize=chunksize):
+        found.update(chunk['target'].astype(str).unique())
+    return found
+
+
+def check_csv(csv_path, required, targets=None, optional=False):
+    # (errors, warnings) を返す
+    # optional=True のファイル（なければ飛ばして描画するもの）は、なくても warning
+    if not os.path.exists(csv_path):
+        message = f"File not found - {csv_path}"
+        return ([], [message]) if optional else ([message], [])
+
+    missing = missing_columns(csv_path, required)
+    if missing:
+        return [f"Missing columns {missing} in {csv_path}"], []
+
+    warnings = []
+    if targets is not None:
+        found = csv_targets(csv_path)
+        absent = [target for target in targets if target not in found]
+        if absent:
+            warnings.append(f"Targets {absent} not found in {csv_path}")
+    return [], warnings
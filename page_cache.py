@@ -0,0 +1,158 @@
+import functools
+import hashlib
+import importlib.util
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+from atomic_file import atomic_write
+
+# --- ページキャッシュ ---
+# 各ページの入力データのハッシュをキーにして、描画済みの1ページPDFを保存する
+# 入力が変わらないページは再描画せず、キャッシュから結合に使う
+PAGE_SUFFIX = '.pdf'
+ARRAY_SUFFIX = '.npz'
+
+# 描画関数のモジュールに加えて、変更でキャッシュを無効化するモジュール
+# （描画の途中で使う、スタイル・間引き・入力の読み込み・PDFへの書き出しのモジュール）
+STYLE_MODULES = (
+    'plot_common',
+    'decimate',
+    'rmse_data',
+    'csv_cache',
+    'complexity_store',
+    'parallel_render',
+    'atomic_file',
+)
+
+
+def hash_parts(*parts):
+    # 文字列・バイト列を順に連結したハッシュ
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def hash_file(file_path, chunk_size=1 << 20):
+    # ファイル内容のハッシュ（ファイルがない場合はNone）
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def hash_frame(df):
+    # DataFrameの列名と値のハッシュ
+    values = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hash_parts(','.join(map(str, df.columns)), values.tobytes())
+
+
+def frame_page_key(item):
+    # (target, DataFrame) のページの入力のハッシュ（render_pdf の page_key）
+    target, df = item
+    return hash_parts(target, hash_frame(df))
+
+
+def render_fingerprint(render_page):
+    # 描画関数と共通スタイルのモジュールのソースをハッシュし、
+    # スタイル変更時にキャッシュを無効化
+    # functools.partial の場合は、固定した引数（描画オプション）も含める
+    options = ''
+    if isinstance(render_page, functools.partial):
+        options = repr(
+            (render_page.args, sorted(render_page.keywords.items()))
+        )
+        render_page = render_page.func
+    source_files = [inspect.getsourcefile(render_page)]
+    for name in STYLE_MODULES:
+        spec = importlib.util.find_spec(name)
+        if spec is not None and spec.origin is not None:
+            source_files.append(spec.origin)
+    return hash_parts(
+        render_page.__module__,
+        render_page.__qualname__,
+        options,
+        *[hash_file(path) or '' for path in source_files],
+    )
+
+
+def page_cache_dir(cache_dir, pdf_path):
+    # 出力PDFごとにサブフォルダを分ける
+    name = os.path.splitext(os.path.basename(pdf_path))[0]
+    path = os.path.join(cache_dir, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_page(cache_path, key):
+    path = os.path.join(cache_path, key + PAGE_SUFFIX)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    # 使ったページの更新日時を新しくする（evict_lru で最後まで残す）
+    os.utime(path)
+    return data
+
+
+def store_page(cache_path, key, data):
+    # 書き込み途中のファイルを読まないよう、一時ファイルから置き換える
+    path = os.path.join(cache_path, key + PAGE_SUFFIX)
+    with atomic_write(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+
+
+def load_arrays(cache_path, key):
+    # 保存した配列（np.savez）を {名前: 配列} として読み込む
+    path = os.path.join(cache_path, key + ARRAY_SUFFIX)
+    try:
+        with np.load(path) as arrays:
+            data = {name: arrays[name] for name in arrays.files}
+    except FileNotFoundError:
+        return None
+    os.utime(path)
+    return data
+
+
+def store_arrays(cache_path, key, **arrays):
+    path = os.path.join(cache_path, key + ARRAY_SUFFIX)
+    # np.savez はパスに .npz を付け足すため、開いたファイルに書き込む
+    with atomic_write(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+
+
+def evict_lru(cache_dir, max_bytes):
+    # キャッシュ全体の大きさが max_bytes を超えたら、使われていない順に削除
+    entries = []
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            if name.endswith((PAGE_SUFFIX, ARRAY_SUFFIX)):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+def prune_pages(cache_path, keep_keys):
+    # 今回のビルドで使わなかった古いページを削除
+    keep = {key + PAGE_SUFFIX for key in keep_keys}
+    for name in os.listdir(cache_path):
+        if name.endswith(PAGE_SUFFIX) and name not in keep:
+            os.remove(os.path.join(cache_path, name))
@@ -0,0 +1,278 @@
+import collections
+import io
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import profiling
+from page_cache import (
+    hash_parts,
+    load_page,
+    page_cache_dir,
+    prune_pages,
+    render_fingerprint,
+    store_page,
+)
+from plot_common import int_at_least
+
+# matplotlib は描画するときに読み込む（起動を軽くするため）
+
+# --- 出力を毎回同じバイト列にするため、作成日時をPDFに書き込まない ---
+PDF_METADATA = {'CreationDate': None}
+
+
+def add_render_arguments(parser):
+    # 各スクリプト共通の描画オプション
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int_at_least(0),
+        default=1,
+        help="描画に使うプロセス数（0: CPUコア数、1: 逐次実行）",
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help="描画済みページのキャッシュ先（指定すると入力が変わったページのみ再描画）",
+    )
+
+
+def add_prefetch_argument(parser):
+    # 逐次描画のときに、入力ファイルを先読みするためのオプション
+    parser.add_argument(
+        '--prefetch',
+        type=int,
+        default=0,
+        help="描画中に次のN個のページの入力をスレッドで先読みする（0: 先読みしない）",
+    )
+
+
+def iter_prefetched(load, items, depth):
+    # items の順に (item, 読み込み結果を返す関数) を返す
+    # 現在のページを描画している間に、次の depth 個の load(item) をスレッドで実行
+    # load が例外を送出した場合は、結果を取り出したとき（そのページの番）に送出される
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        iterator = iter(items)
+        pending = collections.deque(
+            (item, executor.submit(load, item))
+            for item in itertools.islice(iterator, depth)
+        )
+        while pending:
+            item, future = pending.popleft()
+            for next_item in itertools.islice(iterator, 1):
+                pending.append((next_item, executor.submit(load, next_item)))
+            yield item, future.result
+
+
+def _iter_items(items, prefetch, prefetch_depth):
+    # 先読みしない場合は (item, None)
+    if prefetch is None or prefetch_depth <= 0:
+        return ((item, None) for item in items)
+    return iter_prefetched(prefetch, items, prefetch_depth)
+
+
+def _call_render(render_page, item, load):
+    # 先読みした場合は、読み込み結果を返す関数を load として渡す
+    if load is None:
+        return render_page(item)
+    return render_page(item, load=load)
+
+
+def _init_worker(profile=False, trace_memory=False):
+    # ワーカープロセスではGUIを使わないAggバックエンドで描画
+    import matplotlib
+
+    matplotlib.use('Agg')
+    if profile:
+        # 記録はページごとに親プロセスへ返す（ワーカーではファイルに書かない）
+        # fork で引き継いだ親プロセスの記録は捨てる
+        profiling.enable(trace_memory=trace_memory)
+        profiling.drain()
+
+
+def _page_label(item):
+    # 計測結果に残すページ名（item が (target, data) の場合は target）
+    return item[0] if isinstance(item, tuple) else str(item)
+
+
+def _render_page_bytes(render_page, item, load=None):
+    # 1ページ分のグラフを描画し、1ページのPDFのバイト列として返す
+    import matplotlib.pyplot as plt
+
+    with profiling.stage('render_page', target=_page_label(item)):
+        fig = _call_render(render_page, item, load)
+        if fig is None:
+            return None
+        buf = io.BytesIO()
+        with profiling.stage('savefig', target=_page_label(item)):
+            fig.savefig(buf, format='pdf', metadata=PDF_METADATA)
+        plt.close(fig)
+    return buf.getvalue()
+
+
+def _render_page_in_worker(render_page, item):
+    # ワーカーでの描画結果と、そのページの計測結果を合わせて返す
+    return _render_page_bytes(render_page, item), profiling.drain()
+
+
+def merge_pdf_pages(page_bytes, pdf_path):
+    # 1ページのPDFを元の順番どおりに1つのPDFへ結合
+    from pypdf import PdfReader, PdfWriter
+
+    with profiling.stage('merge_pdf'):
+        writer = PdfWriter()
+        for data in page_bytes:
+            if data is not None:
+                writer.append(PdfReader(io.BytesIO(data)))
+        with open(pdf_path, 'wb') as f:
+            writer.write(f)
+
+
+def _render_pages(render_page, items, jobs, prefetch=None, prefetch_depth=0):
+    # 各ページを1ページのPDFのバイト列として描画（map で元の順番を保つ）
+    if not items:
+        return []
+    if jobs == 1:
+        return [
+            _render_page_bytes(render_page, item, load)
+            for item, load in _iter_items(items, prefetch, prefetch_depth)
+        ]
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(profiling.enabled(), profiling.trace_memory()),
+    ) as executor:
+        results = list(
+            executor.map(partial(_render_page_in_worker, render_page), items)
+        )
+    page_bytes = []
+    for data, records in results:
+        page_bytes.append(data)
+        profiling.extend(records)
+    return page_bytes
+
+
+def _render_pages_incremental(
+    render_page,
+    items,
+    jobs,
+    cache_path,
+    page_key,
+    prefetch=None,
+    prefetch_depth=0,
+):
+    # 入力のハッシュが変わったページだけを描画し、残りはキャッシュを使う
+    # page_key(item) が None を返すページはキャッシュせず毎回描画する
+    fingerprint = render_fingerprint(render_page)
+    keys = []
+    for item in items:
+        key = page_key(item)
+        keys.append(None if key is None else hash_parts(fingerprint, key))
+
+    page_bytes = [
+        None if key is None else load_page(cache_path, key) for key in keys
+    ]
+    stale = [i for i, data in enumerate(page_bytes) if data is None]
+    rendered = _render_pages(
+        render_page,
+        [items[i] for i in stale],
+        jobs,
+        prefetch=prefetch,
+        prefetch_depth=prefetch_depth,
+    )
+    for i, data in zip(stale, rendered):
+        page_bytes[i] = data
+        if data is not None and keys[i] is not None:
+            store_page(cache_path, keys[i], data)
+
+    prune_pages(cache_path, [key for key in keys if key is not None])
+    print(f"Re-rendered {len(stale)} of {len(items)} pages")
+    return page_bytes
+
+
+def render_pdf(
+    render_page,
+    items,
+    pdf_path,
+    jobs=1,
+    cache_dir=None,
+    page_key=None,
+    prefetch=None,
+    prefetch_depth=0,
+):
+    # items の各要素について render_page(item) でFigureを作成し、
+    # 1つのPDFにまとめて保存する（render_page が None を返したページは飛ばす）
+    # jobs や cache_dir によらず、各ページを1ページのPDFにしてから同じ方法で結合するため、
+    # 同じ入力からは同じバイト列のPDFになる（pypdf がない環境の逐次描画を除く）
+    # render_page はワーカーに渡すため、モジュールのトップレベル関数であること
+    # cache_dir と page_key（item -> 入力データのハッシュ）を指定すると、
+    # ハッシュが変わったページだけを再描画する
+    # 逐次描画（jobs=1）で prefetch（item -> 入力データ）を指定すると、
+    # 次の prefetch_depth 個のページの入力をスレッドで先読みし、
+    # render_page(item, load=...) の load() で読み込み結果を受け取る
+    # （ワーカープロセスで描画する場合は、各ワーカーが render_page(item) で読み込む）
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    items = list(items)
+
+    if cache_dir is not None and page_key is not None:
+        cache_path = page_cache_dir(cache_dir, pdf_path)
+        page_bytes = _render_pages_incremental(
+            render_page,
+            items,
+            jobs,
+            cache_path,
+            page_key,
+            prefetch=prefetch,
+            prefetch_depth=prefetch_depth,
+        )
+        merge_pdf_pages(page_bytes, pdf_path)
+        return
+
+    if jobs == 1:
+        if _has_pypdf():
+            # 描画したページから順に結合する（全ページのバイト列を保持しない）
+            merge_pdf_pages(
+                (
+                    _render_page_bytes(render_page, item, load)
+                    for item, load in _iter_items(
+                        items, prefetch, prefetch_depth
+                    )
+                ),
+                pdf_path,
+            )
+            return
+        _write_pdf_pages(
+            render_page, items, pdf_path, prefetch, prefetch_depth
+        )
+        return
+
+    # 各ページをワーカープロセスで描画し、元の順番のまま結合
+    merge_pdf_pages(_render_pages(render_page, items, jobs), pdf_path)
+
+
+def _has_pypdf():
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _write_pdf_pages(render_page, items, pdf_path, prefetch, prefetch_depth):
+    # pypdf がない場合は、PdfPages に直接書き出す
+    # （ページの内容は同じだが、結合したPDFとはバイト列が異なる）
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(pdf_path, metadata=PDF_METADATA) as pdf:
+        for item, load in _iter_items(items, prefetch, prefetch_depth):
+            label = _page_label(item)
+            with profiling.stage('render_page', target=label):
+                fig = _call_render(render_page, item, load)
+                if fig is None:
+                    continue
+                with profiling.stage('savefig', target=label):
+                    pdf.savefig(fig)  # PDFに現在のグラフを保存
+                plt.close(fig)  # メモリ解放
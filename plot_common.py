@@ -0,0 +1,378 @@
+import argparse
+import os
+
+import numpy as np
+from decimate import MIN_POINTS, minmax_decimate
+from profiling import stage
+from rmse_data import NO_VARIANCE_MODELS
+
+# matplotlib は起動時間の大部分を占めるため、実際に描画するときに読み込む
+# （入力の検証だけの実行などでは読み込まない）
+
+# --- 1ページのグラフの共通スタイル（フォントサイズ） ---
+PAGE_FIGSIZE = (12, 8)
+TITLE_FONTSIZE = 28
+LABEL_FONTSIZE = 24
+TICK_FONTSIZE = 22
+LEGEND_FONTSIZE = 22
+
+# --- 内挿・外挿の棒の設定（列名、色） ---
+RMSE_BAR_SERIES = [
+    ('Interpolation RMSE', 'red'),
+    ('Extrapolation RMSE', 'blue'),
+]
+
+
+def draw_rmse_bars(ax, df, bar_width=0.2, capsize=5):
+    # モデルごとの内挿・外挿RMSEを、系列ごとに1回の ax.bar でまとめて描画
+    # df は 'Model', '{系列} RMSE', '{系列} RMSE Std'（標準偏差）の列を持つ
+    # モデル数によらず、系列ごとの artist の数は一定（棒・縦線・キャップ）
+    index = np.arange(len(df))
+    # SRなど分散を持たないモデルはエラーバーを描かない
+    has_error = ~df['Model'].isin(NO_VARIANCE_MODELS).to_numpy()
+    offsets = [-bar_width / 2, bar_width / 2]
+    for (column, color), offset in zip(RMSE_BAR_SERIES, offsets):
+        values = df[column].to_numpy(dtype=float)
+        errors = df[f'{column} Std'].to_numpy(dtype=float)
+        ax.bar(index + offset, values, bar_width, label=column, color=color)
+        if has_error.any():
+            _draw_error_bars(
+                ax,
+                index[has_error] + offset,
+                values[has_error],
+                errors[has_error],
+                capsize,
+            )
+    return index
+
+
+def _draw_error_bars(ax, x, y, errors, capsize):
+    # ax.bar の yerr と同じ見た目のエラーバーを、縦線とキャップの2つの artist で描く
+    # キャップを ax.errorbar に描かせると全キャップが1本の Line2D になり、
+    # キャップの間の線分が凡例の 'best' の位置の判定で重なりとして数えられるため、
+    # キャップは点（scatter）として描く
+    # 元の棒ごとのキャップ（点1つの Line2D）は 'best' の判定で頂点と線分の交差の
+    # 2回数えられるため、同じ位置に大きさ0の点を重ねて判定の重みをそろえる
+    import matplotlib as mpl
+
+    ax.errorbar(
+        x,
+        y,
+        yerr=errors,
+        fmt='none',
+        ecolor='k',
+        capsize=0,
+        label='_nolegend_',
+    )
+    caps_x = np.concatenate([x, x])
+    caps_y = np.concatenate([y - errors, y + errors])
+    sizes = np.zeros(2 * len(caps_x))
+    sizes[: len(caps_x)] = (2 * capsize) ** 2
+    ax.scatter(
+        np.concatenate([caps_x, caps_x]),
+        np.concatenate([caps_y, caps_y]),
+        s=sizes,
+        marker='_',
+        color='k',
+        linewidths=mpl.rcParams['lines.markeredgewidth'],
+        zorder=2,
+        label='_nolegend_',
+    )
+
+
+def add_batch_arguments(parser, default_format='png', default_output_dir='.'):
+    # 画面表示せずにファイルへまとめて書き出すためのオプション
+    # default_output_dir が None の場合、--output-dir か --headless の指定時のみ保存
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help="GUIを使わず（Aggバックエンド）、ファイルへの保存のみ行う",
+    )
+    parser.add_argument(
+        '--output-dir', default=default_output_dir, help="保存先フォルダ"
+    )
+    parser.add_argument(
+        '--format',
+        choices=['png', 'pdf'],
+        default=default_format,
+        help="保存するファイル形式",
+    )
+    parser.add_argument('--dpi', type=int, default=300)
+
+
+def int_at_least(minimum):
+    # argparse の type に渡す、minimum 以上の整数だけを受け付ける変換関数
+    def integer(value):
+        number = int(value)
+        if number < minimum:
+            raise argparse.ArgumentTypeError(
+                f"must be an integer >= {minimum}: {value}"
+            )
+        return number
+
+    return integer
+
+
+def add_decimation_arguments(parser):
+    # 点数の多い曲線を軽いPDFにするためのオプション
+    parser.add_argument(
+        '--max-points',
+        type=int_at_least(MIN_POINTS),
+        default=None,
+        help="各曲線の点数の上限（x軸のバケットごとに最小・最大の点を残して間引く）",
+    )
+    parser.add_argument(
+        '--rasterize',
+        action='store_true',
+        help="曲線だけをラスタ画像にする（軸・文字はベクタのまま）",
+    )
+
+
+def add_panel_arguments(parser):
+    # targetの多い棒グラフを複数のパネル・ページに分けるためのオプション
+    parser.add_argument(
+        '--targets-per-panel',
+        type=int_at_least(1),
+        default=None,
+        help="1つのグラフ（パネル）に描くtargetの数（省略時はすべてを1つに描く）",
+    )
+    parser.add_argument(
+        '--panels-per-page',
+        type=int_at_least(1),
+        default=1,
+        help="1ページに縦に並べるパネルの数",
+    )
+
+
+def panel_pages(n_items, items_per_panel=None, panels_per_page=1):
+    # 項目（target）を items_per_panel 個ずつのパネル（slice）に分け、
+    # panels_per_page 個ずつのページにまとめる
+    # items_per_panel が None の場合は、すべての項目を1ページ1パネルに描く
+    if items_per_panel is None:
+        items_per_panel = max(n_items, 1)
+    if items_per_panel < 1 or panels_per_page < 1:
+        raise ValueError("items_per_panel and panels_per_page must be >= 1")
+    panels = [
+        slice(start, min(start + items_per_panel, n_items))
+        for start in range(0, n_items, items_per_panel)
+    ] or [slice(0, 0)]
+    return [
+        panels[i : i + panels_per_page]
+        for i in range(0, len(panels), panels_per_page)
+    ]
+
+
+def is_paginated(pages):
+    # 2つ以上のパネルに分かれているか（1つの場合は従来どおりの1枚のグラフ）
+    return len(pages) > 1 or len(pages[0]) > 1
+
+
+def shared_ylim(values, errors=None, margin=1.1):
+    # すべてのパネルで共通の y 軸の範囲（エラーバーの上端を含む最大値に余裕を持たせる）
+    top = values if errors is None else values + np.nan_to_num(errors)
+    if not np.isfinite(top).any():
+        return None
+    return (0, np.nanmax(top) * margin)
+
+
+def render_panel_pages(
+    pdf,
+    pages,
+    draw_panel,
+    title,
+    xlabel='Target',
+    ylim=None,
+    figsize=(16, 10),
+):
+    # panel_pages で分けたページを順に描画し、PdfPages に保存
+    # draw_panel(ax, panel) はパネル（targetの slice）の棒・目盛り・y軸ラベルを描く
+    # タイトルと凡例は各ページの最上段、x軸ラベルは最下段のパネルにだけ付ける
+    import matplotlib.pyplot as plt
+
+    paginated = is_paginated(pages)
+    # 最後のパネルのtargetが少なくても、棒の幅がパネル間でそろうようにする
+    width = max(
+        panel.stop - panel.start for panels in pages for panel in panels
+    )
+    for number, panels in enumerate(pages, 1):
+        n_panels = len(panels)
+        fig, axes = plt.subplots(
+            n_panels,
+            1,
+            figsize=(figsize[0], figsize[1] * max(1, n_panels / 2)),
+            squeeze=False,
+        )
+        axes = axes[:, 0]
+        for ax, panel in zip(axes, panels):
+            draw_panel(ax, panel)
+            if paginated:
+                ax.set_xlim(-0.5, width - 0.5)
+            if ylim is not None:
+                ax.set_ylim(*ylim)
+
+        page_title = (
+            title if len(pages) == 1 else f"{title} ({number}/{len(pages)})"
+        )
+        axes[0].set_title(page_title, fontsize=24)
+        axes[-1].set_xlabel(xlabel, fontsize=20)
+        # 重複するラベルを除くために、一度辞書に格納してからlegendを設定
+        handles, labels = axes[0].get_legend_handles_labels()
+        by_label = dict(zip(labels, handles))
+        axes[0].legend(by_label.values(), by_label.keys(), fontsize=12)
+        with stage('tight_layout'):
+            fig.tight_layout()
+        with stage('savefig', target=page_title):
+            pdf.savefig(fig)
+        plt.close(fig)
+
+
+def use_headless_backend():
+    # 非対話的なAggバックエンドに切り替え（plt.show() はブロックしない）
+    import matplotlib
+
+    matplotlib.use('Agg', force=True)
+
+
+def finish_figure(fig, args, name):
+    # グラフを保存し、対話モードなら表示してから、必ずFigureを閉じる
+    import matplotlib.pyplot as plt
+
+    output_path = None
+    if args.output_dir is not None or args.headless:
+        output_dir = args.output_dir or '.'
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, f"{name}.{args.format}")
+        with stage('savefig', target=name):
+            fig.savefig(output_path, dpi=args.dpi, bbox_inches="tight")
+        print(f"Graph saved as: {output_path}")
+    if not args.headless:
+        plt.show()
+    plt.close(fig)  # メモリ解放
+    return output_path
+
+
+def _format_3g(x, _):
+    # y軸の目盛りを有効数字3桁で表示
+    return f'{x:.3g}'
+
+
+class PageTemplate:
+    # targetごとの1ページのグラフのひな形
+    # Figureと固定の装飾（x軸ラベル、目盛り、書式、グリッド）は1回だけ作成し、
+    # targetごとにはデータ・タイトル・y軸の単位だけを差し替えて使い回す
+    # pyplot を介さない Figure なので、plt.close しなくても蓄積しない
+    # tick_axis は目盛りの文字サイズを tick_params で設定する軸
+    # （棒グラフの x 軸はモデル名と一緒に set_xticklabels で設定する）
+
+    def __init__(
+        self, xlabel, xscale=None, figsize=PAGE_FIGSIZE, tick_axis='both'
+    ):
+        from matplotlib.figure import Figure
+        from matplotlib.ticker import FuncFormatter
+
+        self.fig = Figure(figsize=figsize)
+        self.ax = self.fig.add_subplot()
+        if xscale is not None:
+            self.ax.set_xscale(xscale)
+        self.ax.set_xlabel(xlabel, fontsize=LABEL_FONTSIZE)
+        self.ax.tick_params(axis=tick_axis, labelsize=TICK_FONTSIZE)
+        self.ax.yaxis.set_major_formatter(FuncFormatter(_format_3g))
+        self.ax.grid(True, linestyle="--", alpha=0.7)
+        # tight_layout は現在の余白から計算するため、毎ページ初期値に戻してから行う
+        # （前のページの余白から計算すると、新しいFigureとわずかにずれる）
+        self.subplotpars = {
+            name: getattr(self.fig.subplotpars, name)
+            for name in ('left', 'bottom', 'right', 'top')
+        }
+
+    def finish(self, title, ylabel):
+        # タイトルと単位を差し替え、データに合わせて軸範囲とレイアウトを更新
+        self.ax.set_title(title, fontsize=TITLE_FONTSIZE)
+        self.ax.set_ylabel(ylabel, fontsize=LABEL_FONTSIZE)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        with stage('tight_layout'):
+            self.fig.subplots_adjust(**self.subplotpars)
+            self.fig.tight_layout()
+        return self.fig
+
+
+class LinePageTemplate(PageTemplate):
+    # 折れ線グラフ（Complexity、エポック数など）のひな形
+    # max_points を指定すると各線を min/max で間引き、
+    # rasterized=True の場合は線だけをラスタ画像にする（軸と文字はベクタのまま）
+    # update の bands を指定すると、各線の信頼区間を同じ色の帯で描く
+
+    def __init__(
+        self,
+        xlabel,
+        labels,
+        xscale=None,
+        markersize=8,
+        max_points=None,
+        rasterized=False,
+    ):
+        super().__init__(xlabel, xscale=xscale)
+        self.max_points = max_points
+        self.rasterized = rasterized
+        self.log_x = xscale == 'log'
+        self.bands = []
+        self.lines = [
+            self.ax.plot(
+                [],
+                [],
+                marker="o",
+                label=label,
+                markersize=markersize,
+                rasterized=rasterized,
+            )[0]
+            for label in labels
+        ]
+        self.ax.legend(fontsize=LEGEND_FONTSIZE)
+
+    def update(self, x, ys, title, ylabel, bands=None):
+        # 各線のデータだけを差し替える
+        # bands は各線の (下限, 上限) のリスト（帯は前のページの分を消して描き直す）
+        for line, y in zip(self.lines, ys):
+            if self.max_points is not None:
+                line.set_data(
+                    *minmax_decimate(x, y, self.max_points, log_x=self.log_x)
+                )
+            else:
+                line.set_data(x, y)
+        for band in self.bands:
+            band.remove()
+        self.bands = [
+            self.ax.fill_between(
+                x,
+                low,
+                high,
+                color=line.get_color(),
+                alpha=0.2,
+                linewidth=0,
+                rasterized=self.rasterized,
+            )
+            for line, (low, high) in zip(self.lines, bands or [])
+        ]
+        return self.finish(title, ylabel)
+
+
+class BarPageTemplate(PageTemplate):
+    # モデル別の内挿・外挿RMSEの棒グラフのひな形
+    # targetごとにモデル数が変わるため、棒とエラーバー（系列ごとに一定の数）だけを描き直す
+
+    def __init__(self, bar_width=0.2):
+        super().__init__('Model', tick_axis='y')
+        self.bar_width = bar_width
+
+    def update(self, df, title, ylabel):
+        for container in list(self.ax.containers):
+            container.remove()
+        # エラーバーのキャップ（scatter）はコンテナに含まれないため別に消す
+        for collection in list(self.ax.collections):
+            collection.remove()
+        index = draw_rmse_bars(self.ax, df, bar_width=self.bar_width)
+        self.ax.set_xticks(index)
+        self.ax.set_xticklabels(df['Model'], fontsize=TICK_FONTSIZE)
+        self.ax.legend(fontsize=LEGEND_FONTSIZE)
+        return self.finish(title, ylabel)
@@ -1,6 +1,8 @@
-from PIL import Image
-from fpdf import FPDF
+import argparse
+import mmap
 import os
+import struct
+import zlib
 
 targets = [
     'dGs',
@@ -16,21 +18,341 @@ targets = [
     'Tm',
 ]
 
-# PDF作成
-pdf = FPDF()
-for target in targets:
-    # 画像ファイルのパスを取得
-    img_path = f"/Users/sshunsuke/Downloads/rmse_{target}.png"  # PNGファイルが保存されているフォルダ
-    output_pdf = f"/Users/sshunsuke/Downloads/rmse_{target}.pdf"  # 出力するPDFファイル名
-
-    img = Image.open(img_path)
-
-    # 画像サイズの取得
-    width, height = img.size
-    pdf.add_page()
-    pdf.image(
-        img_path, x=0, y=0, w=210, h=297
-    )  # A4サイズに合わせる例（変更可能）
-    # PDF保存
-    pdf.output(output_pdf)
+# 画像ファイル（rmse_{target}.png）と出力先のフォルダ
+image_dir = "/Users/sshunsuke/Downloads/"
+output_dir = "/Users/sshunsuke/Downloads/"
+
+# A4サイズ（mm）
+PAGE_WIDTH = 210
+PAGE_HEIGHT = 297
+# PDFの座標の単位（pt）への変換
+PT_PER_MM = 72 / 25.4
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEGのSOFマーカー（画像サイズを含むセグメント）
+# （DHT: 0xC4, JPG: 0xC8, DAC: 0xCC を除く）
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# --- 画像をデコードせずにPDFへ埋め込む ---
+# PNGのIDAT（zlib圧縮のデータ）とJPEGのファイル全体は、PDFの FlateDecode /
+# DCTDecode のストリームとしてそのまま使えるため、mmapで読んだバイト列を
+# 展開・再圧縮せずに書き出す
+# アルファチャンネル付きのPNG（matplotlibの既定のRGBA）やインターレースなど、
+# そのまま埋め込めない画像だけをPillowでデコードして変換する
+PNG_COLORS = {0: ('/DeviceGray', 1), 2: ('/DeviceRGB', 3)}
+JPEG_COLOR_SPACES = {1: '/DeviceGray', 3: '/DeviceRGB'}
+# 変換した画像の圧縮レベル（zlibの既定値）
+TRANSCODE_COMPRESSION = 6
+
+
+def _jpeg_info(view):
+    # SOFセグメントが見つかるまでマーカーを読み飛ばし、(幅, 高さ, 色数) を返す
+    pos = 2
+    size = len(view)
+    while pos < size:
+        if view[pos] != 0xFF:
+            pos += 1
+            continue
+        # 0xFFの詰め物を読み飛ばす
+        while pos < size and view[pos] == 0xFF:
+            pos += 1
+        if pos >= size:
+            break
+        code = view[pos]
+        pos += 1
+        # 長さを持たないマーカー（TEM, RSTn）
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            continue
+        (length,) = struct.unpack_from('>H', view, pos)
+        if code in JPEG_SOF_MARKERS:
+            # サンプル精度（1バイト）の後に高さ・幅・色数
+            height, width, components = struct.unpack_from(
+                '>HHB', view, pos + 3
+            )
+            return width, height, components
+        pos += length
+    raise ValueError("JPEG size not found")
+
+
+def _png_chunks(view):
+    # (チャンクの種類, データの開始位置, 終了位置) を順に返す
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(view):
+        length, kind = struct.unpack_from('>I4s', view, pos)
+        start = pos + 8
+        yield kind, start, start + length
+        if kind == b'IEND':
+            return
+        pos = start + length + 4  # CRC
+
+
+def _png_image(view):
+    # そのまま埋め込めるPNGなら (ページの大きさ, 画像の辞書, データ) を返す
+    # （アルファ付き・透過色・インターレース・16bitなどは None）
+    ihdr = None
+    palette = None
+    idat = []
+    for kind, start, end in _png_chunks(view):
+        if kind == b'IHDR':
+            ihdr = struct.unpack_from('>IIBBBBB', view, start)
+        elif kind == b'PLTE':
+            palette = bytes(view[start:end])
+        elif kind == b'tRNS':
+            return None
+        elif kind == b'IDAT':
+            idat.append(view[start:end])
+    width, height, bit_depth, color_type, _, _, interlace = ihdr
+    if interlace != 0 or bit_depth > 8:
+        return None
+    if color_type == 3 and palette is not None:
+        n_colors = 1
+        color_space = (
+            f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} "
+            f"<{palette.hex()}>]"
+        )
+    elif color_type in PNG_COLORS and bit_depth == 8:
+        color_space, n_colors = PNG_COLORS[color_type]
+    else:
+        return None
+    entries = (
+        f"/Width {width} /Height {height} /ColorSpace {color_space} "
+        f"/BitsPerComponent {bit_depth} /Filter /FlateDecode "
+        f"/DecodeParms << /Predictor 15 /Colors {n_colors} "
+        f"/BitsPerComponent {bit_depth} /Columns {width} >>"
+    )
+    return (width, height), entries, idat, None
+
+
+def _jpeg_image(view):
+    # グレー・RGBのJPEGはファイル全体をそのまま DCTDecode で埋め込む
+    width, height, components = _jpeg_info(view)
+    if components not in JPEG_COLOR_SPACES:
+        return None
+    entries = (
+        f"/Width {width} /Height {height} "
+        f"/ColorSpace {JPEG_COLOR_SPACES[components]} "
+        f"/BitsPerComponent 8 /Filter /DCTDecode"
+    )
+    return (width, height), entries, [view], None
+
+
+def _transcode_image(img_path):
+    # そのまま埋め込めない画像のみ、Pillowでデコードして変換
+    # 不透明なアルファは捨て、透過がある場合は SMask として書き出す
+    from PIL import Image
+
+    with Image.open(img_path) as img:
+        img.load()
+        if img.mode in ('1', 'L', 'I', 'I;16', 'F'):
+            base = img.convert('L')
+            alpha = None
+        else:
+            rgba = img.convert('RGBA')
+            base = rgba.convert('RGB')
+            alpha = rgba.getchannel('A')
+            if alpha.getextrema() == (255, 255):
+                alpha = None
+    width, height = base.size
+
+    def flate(image, color_space):
+        entries = (
+            f"/Width {width} /Height {height} /ColorSpace {color_space} "
+            f"/BitsPerComponent 8 /Filter /FlateDecode"
+        )
+        data = zlib.compress(image.tobytes(), TRANSCODE_COMPRESSION)
+        return entries, [data]
+
+    color_space = '/DeviceGray' if base.mode == 'L' else '/DeviceRGB'
+    entries, data = flate(base, color_space)
+    smask = None if alpha is None else flate(alpha, '/DeviceGray')
+    return (width, height), entries, data, smask
+
+
+def fit_to_page(width, height):
+    # 縦横比を保ったままページに収まるように拡大・縮小し、中央に配置
+    scale = min(PAGE_WIDTH / width, PAGE_HEIGHT / height)
+    w = width * scale
+    h = height * scale
+    x = (PAGE_WIDTH - w) / 2
+    y = (PAGE_HEIGHT - h) / 2
+    return x, y, w, h
+
+
+class ImagePdfWriter:
+    # 画像を1枚1ページとして、PDFへ順に直接書き出す
+    # 各ページは追加した時点でファイルに書き、メモリには各オブジェクトの位置のみ保持
+    # （オブジェクト1: Catalog, 2: Pages はページ数が決まる close 時に書く）
+
+    def __init__(self, output_pdf):
+        self.f = open(output_pdf, 'wb')
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3
+        self.f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_id(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body):
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(f"{obj_id} 0 obj\n{body}\nendobj\n".encode('latin-1'))
+
+    def _write_stream(self, obj_id, entries, chunks):
+        # chunks（bytes / memoryview）をコピーせずにそのまま書き出す
+        length = sum(len(chunk) for chunk in chunks)
+        self.offsets[obj_id] = self.f.tell()
+        header = f"{obj_id} 0 obj\n<< {entries} /Length {length} >>\nstream\n"
+        self.f.write(header.encode('latin-1'))
+        for chunk in chunks:
+            self.f.write(chunk)
+        self.f.write(b"\nendstream\nendobj\n")
+
+    def _add_image(self, size, entries, chunks, smask):
+        # 画像のXObjectと、ページの中央に配置するページを書き出す
+        image_id = self._new_id()
+        if smask is not None:
+            smask_id = self._new_id()
+            self._write_stream(smask_id, *smask)
+            entries += f" /SMask {smask_id} 0 R"
+        self._write_stream(
+            image_id, f"/Type /XObject /Subtype /Image {entries}", chunks
+        )
+
+        x, y, w, h = fit_to_page(*size)
+        # PDFの座標は左下が原点
+        content = (
+            f"q {w * PT_PER_MM:.4f} 0 0 {h * PT_PER_MM:.4f} "
+            f"{x * PT_PER_MM:.4f} {(PAGE_HEIGHT - y - h) * PT_PER_MM:.4f} "
+            f"cm /Im0 Do Q"
+        ).encode('latin-1')
+        content_id = self._new_id()
+        self._write_stream(content_id, '', [content])
+
+        page_id = self._new_id()
+        self._write_object(
+            page_id,
+            f"<< /Type /Page /Parent 2 0 R "
+            f"/MediaBox [0 0 {PAGE_WIDTH * PT_PER_MM:.4f} "
+            f"{PAGE_HEIGHT * PT_PER_MM:.4f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> "
+            f"/Contents {content_id} 0 R >>",
+        )
+        self.page_ids.append(page_id)
+
+    def add_image_page(self, img_path):
+        # PNG/JPEGはmmapで読み、そのまま埋め込めるならデコードしない
+        # （空のファイルは mmap できないため、先に大きさを確かめる）
+        if os.path.getsize(img_path) == 0:
+            raise ValueError(f"Empty image file - {img_path}")
+        with open(img_path, 'rb') as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm, memoryview(mm) as view:
+            image = None
+            if view[:8] == PNG_SIGNATURE:
+                image = _png_image(view)
+            elif view[:2] == b'\xff\xd8':
+                image = _jpeg_image(view)
+            if image is not None:
+                self._add_image(*image)
+                # mmapを閉じる前に、部分的なmemoryviewを解放する
+                del image
+                return
+        self._add_image(*_transcode_image(img_path))
+
+    def close(self):
+        if self.f.closed:
+            return
+        kids = ' '.join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(
+            2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>"
+        )
+        self._write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self.f.tell()
+        self.f.write(f"xref\n0 {self.next_id}\n".encode('latin-1'))
+        self.f.write(b"0000000000 65535 f \n")
+        for obj_id in range(1, self.next_id):
+            self.f.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode())
+        self.f.write(
+            f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n".encode('latin-1')
+        )
+        self.f.close()
+
+
+def _check_image(img_path):
+    # 画像がない・空の場合は警告して飛ばす
+    if not os.path.exists(img_path):
+        print(f"Warning: File not found - {img_path}")
+        return False
+    if os.path.getsize(img_path) == 0:
+        print(f"Warning: Empty file - {img_path}")
+        return False
+    return True
+
+
+def pack_per_image(jobs):
+    # 画像1枚ごとに1つのPDFを作成（各PDFは1ページのみ）
+    for img_path, output_pdf in jobs:
+        if not _check_image(img_path):
+            continue
+        with ImagePdfWriter(output_pdf) as pdf:
+            pdf.add_image_page(img_path)
+        print(f"PDFが作成されました: {output_pdf}")
+
+
+def pack_combined(img_paths, output_pdf):
+    # 全ての画像を1つのPDFにまとめる（ページは追加するたびに書き出す）
+    with ImagePdfWriter(output_pdf) as pdf:
+        for img_path in img_paths:
+            if not _check_image(img_path):
+                continue
+            pdf.add_image_page(img_path)
     print(f"PDFが作成されました: {output_pdf}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="rmse_{target}.png をPDFに変換します"
+    )
+    parser.add_argument(
+        '--mode',
+        choices=['per-image', 'combined'],
+        default='per-image',
+        help="per-image: 画像ごとにPDFを作成 / combined: 1つのPDFにまとめる",
+    )
+    parser.add_argument('--image-dir', default=image_dir)
+    parser.add_argument('--output-dir', default=output_dir)
+    parser.add_argument(
+        '--combined-name',
+        default='rmse_all_images.pdf',
+        help="combinedモードで出力するPDFファイル名",
+    )
+    args = parser.parse_args()
+
+    img_paths = [
+        os.path.join(args.image_dir, f"rmse_{target}.png")
+        for target in targets
+    ]
+    if args.mode == 'per-image':
+        output_pdfs = [
+            os.path.join(args.output_dir, f"rmse_{target}.pdf")
+            for target in targets
+        ]
+        pack_per_image(zip(img_paths, output_pdfs))
+    else:
+        pack_combined(
+            img_paths, os.path.join(args.output_dir, args.combined_name)
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import atexit
+import contextlib
+import csv
+import json
+import os
+import time
+import tracemalloc
+
+# --- 処理段階ごとの時間・メモリ計測 ---
+# --profile PATH または環境変数 VISUALIZE_PROFILE=PATH を指定したときだけ有効
+# 各段階（CSVの読み込み、集計、正規化、tight_layout、savefig など）と
+# targetごとの描画の時間、tracemalloc によるピークメモリを記録し、
+# 終了時に PATH（拡張子 .json または .csv）へ書き出す
+PROFILE_ENV = 'VISUALIZE_PROFILE'
+
+_state = {'enabled': False, 'trace_memory': False, 'output_path': None}
+_records = []
+# 入れ子の段階のピークメモリを親に伝えるためのスタック
+_peak_stack = []
+
+
+def enable(output_path=None, trace_memory=True):
+    _state['enabled'] = True
+    _state['trace_memory'] = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if output_path is not None and _state['output_path'] is None:
+        _state['output_path'] = output_path
+        atexit.register(write_profile)
+
+
+def enabled():
+    return _state['enabled']
+
+
+def trace_memory():
+    return _state['trace_memory']
+
+
+def add_profile_argument(parser):
+    parser.add_argument(
+        '--profile',
+        default=None,
+        help="処理段階ごとの時間・メモリを書き出すファイル（.json / .csv）",
+    )
+
+
+def setup_profiling(args=None):
+    # --profile の指定、なければ環境変数 VISUALIZE_PROFILE で有効にする
+    output_path = getattr(args, 'profile', None) or os.environ.get(PROFILE_ENV)
+    if output_path:
+        enable(output_path)
+
+
+def record(name, seconds, peak_mb=None, target=None):
+    _records.append(
+        {
+            'stage': name,
+            'target': target,
+            'seconds': seconds,
+            'peak_mb': peak_mb,
+            'pid': os.getpid(),
+        }
+    )
+
+
+@contextlib.contextmanager
+def stage(name, target=None):
+    # with stage('aggregate'): ... のように処理段階を囲んで計測
+    if not _state['enabled']:
+        yield
+        return
+
+    tracing = _state['trace_memory'] and tracemalloc.is_tracing()
+    if tracing:
+        # 親の段階のここまでのピークを保存してから、この段階用にリセット
+        if _peak_stack:
+            _peak_stack[-1] = max(
+                _peak_stack[-1], tracemalloc.get_traced_memory()[1]
+            )
+        tracemalloc.reset_peak()
+        _peak_stack.append(0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        peak_mb = None
+        if tracing:
+            peak = max(_peak_stack.pop(), tracemalloc.get_traced_memory()[1])
+            peak_mb = peak / 2**20
+            if _peak_stack:
+                _peak_stack[-1] = max(_peak_stack[-1], peak)
+            tracemalloc.reset_peak()
+        record(name, seconds, peak_mb=peak_mb, target=target)
+
+
+def drain():
+    # ワーカープロセスで記録した内容を取り出して親プロセスに返す
+    records = list(_records)
+    _records.clear()
+    return records
+
+
+def extend(records):
+    _records.extend(records)
+
+
+def summarize(records):
+    # 段階ごとの回数・合計時間・最大時間・最大ピークメモリ
+    summary = {}
+    for row in records:
+        item = summary.setdefault(
+            row['stage'],
+            {
+                'stage': row['stage'],
+                'count': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+                'max_peak_mb': None,
+            },
+        )
+        item['count'] += 1
+        item['total_seconds'] += row['seconds']
+        item['max_seconds'] = max(item['max_seconds'], row['seconds'])
+        if row['peak_mb'] is not None:
+            item['max_peak_mb'] = max(item['max_peak_mb'] or 0, row['peak_mb'])
+    return sorted(
+        summary.values(), key=lambda item: item['total_seconds'], reverse=True
+    )
+
+
+def slowest_targets(records, n=20):
+    # targetごとの描画時間の上位
+    per_target = [row for row in records if row['target'] is not None]
+    return sorted(per_target, key=lambda row: row['seconds'], reverse=True)[:n]
+
+
+def write_profile(output_path=None):
+    output_path = output_path or _state['output_path']
+    if output_path is None or not _records:
+        return
+    if output_path.endswith('.csv'):
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(_records[0]))
+            writer.writeheader()
+            writer.writerows(_records)
+    else:
+        profile = {
+            'summary': summarize(_records),
+            'slowest_targets': slowest_targets(_records),
+            'stages': _records,
+        }
+        with open(output_path, 'w') as f:
+            json.dump(profile, f, indent=2, ensure_ascii=False)
+    print(f"Saved profile in: {output_path}")
@@ -0,0 +1,418 @@
+import argparse
+import functools
+import os
+import sys
+
+# すべてファイルへの保存のみなので、GUIを使わないAggバックエンドで描画
+# （matplotlib を読み込む前に環境変数で指定し、描画するときまで読み込まない）
+# 利用者が MPLBACKEND を指定している場合は、その指定を優先する
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import draw_all_combine  # noqa: E402
+import draw_all_combine2  # noqa: E402
+import draw_all_combine_both  # noqa: E402
+import draw_epochs  # noqa: E402
+import draw_graph_all  # noqa: E402
+import draw_plot  # noqa: E402
+import summary_index  # noqa: E402
+from bootstrap import add_bootstrap_arguments  # noqa: E402
+from combine_cache import (  # noqa: E402
+    DEFAULT_CACHE_MAX_MB,
+    add_cache_arguments,
+    cached_normalized,
+    normalized_key,
+    write_cached_report,
+)
+from complexity_store import add_store_argument, open_store  # noqa: E402
+from epoch_data import (  # noqa: E402
+    EPOCH_KEYS,
+    add_epoch_ci,
+    aggregate_epoch_means,
+)
+from input_checks import check_csv  # noqa: E402
+from parallel_render import (  # noqa: E402
+    add_prefetch_argument,
+    add_render_arguments,
+)
+from plot_common import (  # noqa: E402
+    add_decimation_arguments,
+    add_panel_arguments,
+)
+from profiling import (  # noqa: E402
+    add_profile_argument,
+    setup_profiling,
+    stage,
+)
+from rmse_data import MEAN_COLUMNS, load_rmse_tables  # noqa: E402
+from rmse_normalize import normalize_rmse  # noqa: E402
+
+# --- 複数のレポートを1回の実行でまとめて作成 ---
+# 読み込んだCSVや正規化の結果は ReportContext に保持し、レポート間で共有する
+# --validate では描画せず、入力CSVのスキーマと target の網羅状況だけを確認する
+# （この場合 matplotlib は読み込まない）
+
+# --- RMSE統計CSVに必要な列（分散の列はなければ0として扱う） ---
+RMSE_REQUIRED_COLUMNS = ['target'] + MEAN_COLUMNS
+
+
+class ReportContext:
+    # 1回の実行の中で、読み込んだデータと計算結果をキャッシュする
+    # data_dir / output_dir を指定すると、各スクリプトの既定のフォルダの代わりに使う
+
+    # cache_dir を指定すると、正規化済みの配列と描画済みのPDFをディスクにも保存する
+    # store_path を指定すると、Complexity のグラフは統合ストアから読む
+
+    def __init__(
+        self,
+        data_dir=None,
+        output_dir=None,
+        cache_dir=None,
+        cache_max_mb=DEFAULT_CACHE_MAX_MB,
+        store_path=None,
+    ):
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        self.cache_max_mb = cache_max_mb
+        self.store_path = store_path
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def input_path(self, path):
+        # data_dir 指定時は、既定のパスのファイル名だけを data_dir 以下で探す
+        if self.data_dir is None:
+            return path
+        return os.path.join(self.data_dir, os.path.basename(path))
+
+    def output_path(self, save_dir, pdf_name):
+        output_dir = self.output_dir or save_dir
+        os.makedirs(output_dir, exist_ok=True)  # フォルダがない場合は作成
+        return os.path.join(output_dir, pdf_name)
+
+    def rmse_tables(self, csv_files):
+        # 同じCSVの組は1回だけ読み込む
+        paths = {model: self.input_path(p) for model, p in csv_files.items()}
+
+        def load():
+            with stage('load'):
+                return load_rmse_tables(paths)
+
+        return self._cached(('tables', tuple(paths.items())), load)
+
+    def rmse_arrays(self, csv_files, targets):
+        # (model × target × {inter, extra}) の配列
+        tables = self.rmse_tables(csv_files)
+        models = list(csv_files.keys())
+
+        def build():
+            with stage('build_arrays'):
+                return tables.arrays(models, targets)
+
+        return self._cached(('arrays', id(tables), tuple(targets)), build)
+
+    def normalized_key(self, csv_files, targets, mode):
+        # ディスクのキャッシュのキー（入力CSVの内容・モデル・target・正規化の方法）
+        paths = {model: self.input_path(p) for model, p in csv_files.items()}
+        return self._cached(
+            ('normalized_key', tuple(paths.items()), tuple(targets), mode),
+            lambda: normalized_key(paths, list(paths), targets, mode),
+        )
+
+    def normalized(self, csv_files, targets, mode):
+        # 正規化済みの配列（同じ入力・正規化方法なら再計算しない）
+        models = list(csv_files.keys())
+
+        def compute():
+            values, errors = self.rmse_arrays(csv_files, targets)
+            with stage('normalize'):
+                return normalize_rmse(values, errors, mode, models=models)
+
+        key = self.normalized_key(csv_files, targets, mode)
+        return self._cached(
+            ('normalized', key),
+            lambda: cached_normalized(key, compute, cache_dir=self.cache_dir),
+        )
+
+    def check_csv(self, csv_path, required, targets=None, optional=False):
+        # 複数のレポートで共有するCSVは1回だけ検証する
+        path = self.input_path(csv_path)
+        key = ('check', path, tuple(required), tuple(targets or ()), optional)
+        return self._cached(
+            key, lambda: check_csv(path, required, targets, optional)
+        )
+
+    def epoch_means(self, file_path, metrics):
+        path = self.input_path(file_path)
+        return self._cached(
+            ('epochs', path, tuple(metrics)),
+            lambda: aggregate_epoch_means(path, metrics),
+        )
+
+    def epoch_ci(self, file_path, metrics, n_resamples, confidence, seed):
+        # fold の平均とブートストラップ信頼区間
+        path = self.input_path(file_path)
+        grouped = self.epoch_means(file_path, metrics)
+        return self._cached(
+            ('epoch_ci', path, tuple(metrics), n_resamples, confidence, seed),
+            lambda: add_epoch_ci(
+                grouped,
+                path,
+                metrics,
+                n_resamples=n_resamples,
+                confidence=confidence,
+                seed=seed,
+            ),
+        )
+
+
+def run_graph_all(ctx, args):
+    draw_graph_all.write_report(
+        ctx.rmse_tables(draw_graph_all.csv_files),
+        ctx.output_path(draw_graph_all.save_dir, draw_graph_all.pdf_name),
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+    )
+
+
+def run_combine(module, ctx, args):
+    # 正規化の方法だけが異なる draw_all_combine* のレポート
+    # （--cache-dir 指定時は、描画済みのPDFがあれば読み込みも正規化もしない）
+    mode = module.normalization_mode
+    models = list(module.csv_files.keys())
+
+    def load_inputs():
+        norm_values, norm_errors = ctx.normalized(
+            module.csv_files, module.targets, mode
+        )
+        return norm_values, norm_errors, models
+
+    write_cached_report(
+        functools.partial(
+            module.write_report,
+            mode=mode,
+            targets_per_panel=args.targets_per_panel,
+            panels_per_page=args.panels_per_page,
+        ),
+        ctx.output_path(module.save_dir, module.pdf_names[mode]),
+        ctx.normalized_key(module.csv_files, module.targets, mode),
+        load_inputs,
+        cache_dir=ctx.cache_dir,
+        max_mb=ctx.cache_max_mb,
+    )
+
+
+def run_epochs(ctx, args):
+    try:
+        with stage('aggregate'):
+            grouped = ctx.epoch_means(
+                draw_epochs.file_path, draw_epochs.epoch_metrics
+            )
+        if args.bootstrap > 0:
+            with stage('bootstrap'):
+                grouped = ctx.epoch_ci(
+                    draw_epochs.file_path,
+                    draw_epochs.epoch_metrics,
+                    args.bootstrap,
+                    args.confidence,
+                    args.seed,
+                )
+    except FileNotFoundError as e:
+        print(f"Warning: File not found - {e.filename}")
+        return
+    draw_epochs.write_report(
+        grouped,
+        ctx.output_path(draw_epochs.save_dir, draw_epochs.pdf_name),
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+        max_points=args.max_points,
+        rasterized=args.rasterize,
+    )
+
+
+def run_plot(ctx, args):
+    draw_plot.write_report(
+        ctx.output_path(draw_plot.save_dir, draw_plot.pdf_name),
+        results_path=ctx.input_path(draw_plot.error_results_path),
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
+        max_points=args.max_points,
+        rasterized=args.rasterize,
+        prefetch_depth=args.prefetch,
+        store_path=ctx.store_path,
+    )
+
+
+def run_summary(ctx, args):
+    # targetごとの最良のエポック数とパレート最適な点の要約
+    # （エポックの集計は epochs のレポートと共有する）
+    try:
+        with stage('aggregate'):
+            grouped = ctx.epoch_means(
+                draw_epochs.file_path, draw_epochs.epoch_metrics
+            )
+    except FileNotFoundError as e:
+        print(f"Warning: File not found - {e.filename}")
+        grouped = None
+    with stage('load'):
+        points = summary_index.load_complexity_points(
+            draw_plot.target_columns,
+            results_path=ctx.input_path(draw_plot.error_results_path),
+            store_path=ctx.store_path,
+            min_complexity=draw_plot.min_complexity,
+        )
+    with stage('summarize'):
+        summary, front = summary_index.build_summary(grouped, points)
+    summary_index.write_summary(
+        ctx.output_dir or summary_index.save_dir, summary, front
+    )
+
+
+def check_rmse_inputs(module, ctx):
+    # draw_graph_all / draw_all_combine* の入力（モデルごとのRMSE統計CSV）
+    errors, warnings = [], []
+    for path in module.csv_files.values():
+        e, w = ctx.check_csv(path, RMSE_REQUIRED_COLUMNS, module.targets)
+        errors += e
+        warnings += w
+    return errors, warnings
+
+
+def check_epochs_inputs(ctx):
+    return ctx.check_csv(
+        draw_epochs.file_path,
+        EPOCH_KEYS + draw_epochs.epoch_metrics,
+        list(draw_epochs.rmse_units),
+    )
+
+
+def check_plot_inputs(ctx):
+    # targetごとのCSV（ないtargetは描画時に飛ばすので warning）
+    # 統合ストアを使う場合は、ストアとその中のtargetを確認する
+    if ctx.store_path is not None:
+        store = open_store(ctx.store_path)
+        if store is None:
+            return [f"Complexity store not found - {ctx.store_path}"], []
+        absent = [t for t in draw_plot.target_columns if t not in store]
+        if absent:
+            return [], [f"Targets {absent} not found in {ctx.store_path}"]
+        return [], []
+
+    errors, warnings = [], []
+    for target in draw_plot.target_columns:
+        e, w = ctx.check_csv(
+            draw_plot.error_results_path.format(target=target),
+            draw_plot.complexity_columns,
+            optional=True,
+        )
+        errors += e
+        warnings += w
+    return errors, warnings
+
+
+def check_summary_inputs(ctx):
+    errors, warnings = check_epochs_inputs(ctx)
+    e, w = check_plot_inputs(ctx)
+    return errors + e, warnings + w
+
+
+def validate(names, ctx):
+    # 各レポートの入力を検証し、問題がなければ True を返す
+    ok = True
+    for name in names:
+        errors, warnings = VALIDATORS[name](ctx)
+        for message in warnings:
+            print(f"Warning: [{name}] {message}")
+        for message in errors:
+            print(f"Error: [{name}] {message}")
+        ok = ok and not errors
+    print("Validation " + ("passed" if ok else "failed"))
+    return ok
+
+
+# --- レポート名と作成する関数（指定がない場合はこの順にすべて作成） ---
+REPORTS = {
+    'graph_all': run_graph_all,
+    'combine': lambda ctx, args: run_combine(draw_all_combine, ctx, args),
+    'combine2': lambda ctx, args: run_combine(draw_all_combine2, ctx, args),
+    'combine_both': lambda ctx, args: run_combine(
+        draw_all_combine_both, ctx, args
+    ),
+    'epochs': run_epochs,
+    'plot': run_plot,
+    'summary': run_summary,
+}
+
+# --- レポート名と入力を検証する関数 ---
+VALIDATORS = {
+    'graph_all': lambda ctx: check_rmse_inputs(draw_graph_all, ctx),
+    'combine': lambda ctx: check_rmse_inputs(draw_all_combine, ctx),
+    'combine2': lambda ctx: check_rmse_inputs(draw_all_combine2, ctx),
+    'combine_both': lambda ctx: check_rmse_inputs(draw_all_combine_both, ctx),
+    'epochs': check_epochs_inputs,
+    'plot': check_plot_inputs,
+    'summary': check_summary_inputs,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="複数のレポートを1回の実行でまとめて作成します"
+    )
+    parser.add_argument(
+        'reports',
+        nargs='*',
+        metavar='REPORT',
+        help=f"作成するレポート（{', '.join(REPORTS)}、省略時はすべて）",
+    )
+    parser.add_argument(
+        '--data-dir',
+        default=None,
+        help="入力CSVのフォルダ（省略時は各スクリプトの既定のパス）",
+    )
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help="PDFの保存先フォルダ（省略時は各スクリプトの既定のフォルダ）",
+    )
+    parser.add_argument(
+        '--validate',
+        action='store_true',
+        help="描画せず、入力CSVの列とtargetの網羅状況だけを確認する",
+    )
+    add_render_arguments(parser)
+    add_cache_arguments(parser, cache_dir=False)
+    add_prefetch_argument(parser)
+    add_decimation_arguments(parser)
+    add_panel_arguments(parser)
+    add_store_argument(parser)
+    add_bootstrap_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    unknown = [name for name in args.reports if name not in REPORTS]
+    if unknown:
+        parser.error(f"unknown report: {', '.join(unknown)}")
+    setup_profiling(args)
+
+    ctx = ReportContext(
+        data_dir=args.data_dir,
+        output_dir=args.output_dir,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        store_path=args.store,
+    )
+    names = args.reports or list(REPORTS)
+    if args.validate:
+        # 問題があれば終了コード1（スケジューラから実行前に確認するため）
+        sys.exit(0 if validate(names, ctx) else 1)
+
+    for name in names:
+        with stage('report', target=name):
+            REPORTS[name](ctx, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from csv_cache import read_csv_cached
+
+# --- RMSE統計CSV（rmse_statistics_*.csv / rmse_sr.csv）で使用する列 ---
+MEAN_COLUMNS = ['val_rmse_mean', 'test_rmse_mean']
+VARIANCE_COLUMNS = ['val_rmse_variance', 'test_rmse_variance']
+RMSE_COLUMNS = MEAN_COLUMNS + VARIANCE_COLUMNS
+
+# --- エラーバーなし（分散=0）として扱うモデル ---
+NO_VARIANCE_MODELS = ('SR',)
+
+# --- (model × target × {inter, extra}) の配列の最後の軸のインデックス ---
+INTER = 0
+EXTRA = 1
+
+
+class RmseTables:
+    # 全モデルのRMSE統計
+    # target の文字列は全モデル共通の辞書（targets）に1回だけ持ち、
+    # 値は (model × target × {inter, extra}) の連続した配列で持つ
+    # errors は分散の平方根（標準偏差）を読み込み時に計算したもの
+    # targetの検索は辞書で整数のコードに変換し、以降は配列の添字で行う
+
+    def __init__(self, models, targets, values, errors, present):
+        self.models = list(models)
+        self.targets = targets  # pd.Index（target → コード）
+        self.values = values
+        self.errors = errors
+        self.present = present  # (model × target) の bool 配列
+
+    def target_codes(self, targets):
+        # targetのコード（辞書にないtargetは -1）
+        return self.targets.get_indexer(targets)
+
+    def model_positions(self, models):
+        return [self.models.index(model) for model in models]
+
+    def arrays(self, models, targets):
+        # 指定したモデル・targetの (values, errors)（該当targetがないモデルはNaN）
+        rows = self.model_positions(models)
+        codes = self.target_codes(targets)
+        found = codes >= 0
+        values = np.full((len(rows), len(codes), 2), np.nan)
+        errors = np.full((len(rows), len(codes), 2), np.nan)
+        index = np.ix_(rows, codes[found])
+        values[:, found] = self.values[index]
+        errors[:, found] = self.errors[index]
+        return values, errors
+
+    def target_rows(self, target):
+        # 1 target分の (モデルごとの有無, values, errors)
+        code = self.target_codes([target])[0]
+        if code < 0:
+            n_models = len(self.models)
+            return (
+                np.zeros(n_models, dtype=bool),
+                np.empty((n_models, 2)),
+                np.empty((n_models, 2)),
+            )
+        return (
+            self.present[:, code],
+            self.values[:, code],
+            self.errors[:, code],
+        )
+
+    def target_frame(self, target, models=None):
+        # 1 target分のモデル別RMSEのDataFrame（draw_graph*.py の棒グラフの入力）
+        # エラーバーの長さは標準偏差（SRは0として読み込み済み）
+        # 該当targetがないモデルは警告を出して除く
+        models = self.models if models is None else list(models)
+        present, values, errors = self.target_rows(target)
+        rows = self.model_positions(models)
+        present = present[rows]
+        for model, found in zip(models, present):
+            if not found:
+                print(
+                    f"Warning: Target {target} not found in {model}'s CSV file."
+                )
+        values = values[rows][present]
+        errors = errors[rows][present]
+        return pd.DataFrame(
+            {
+                'Model': [m for m, p in zip(models, present) if p],
+                'Extrapolation RMSE': values[:, EXTRA],
+                'Interpolation RMSE': values[:, INTER],
+                'Extrapolation RMSE Std': errors[:, EXTRA],
+                'Interpolation RMSE Std': errors[:, INTER],
+            }
+        )
+
+
+def _read_model_table(file_path, use_variance):
+    # 1モデル分のCSVを読み込み、(target, 平均, 標準偏差) を返す
+    df = read_csv_cached(file_path, usecols=['target'] + RMSE_COLUMNS)
+    # 同じtargetが複数行ある場合は先頭の行を使用（従来の .values[0] と同じ）
+    df = df.drop_duplicates('target')
+    means = df[MEAN_COLUMNS].to_numpy(dtype=float)
+    errors = np.zeros_like(means)
+    if not use_variance:
+        # SRなど分散を持たないモデルは0として扱う
+        return pd.Index(df['target']), means, errors
+    for k, column in enumerate(VARIANCE_COLUMNS):
+        if column in df.columns:
+            errors[:, k] = np.sqrt(df[column].to_numpy(dtype=float))
+        else:
+            # 分散を持つはずのモデルで列がない場合は、警告してエラーバーを0にする
+            print(
+                f"Warning: Column {column} not found in {file_path}; "
+                "drawing no error bars for it."
+            )
+    return pd.Index(df['target']), means, errors
+
+
+def load_rmse_tables(
+    csv_files, no_variance_models=NO_VARIANCE_MODELS, dtype=np.float64
+):
+    # 各モデルのCSVを1回だけ読み込み、RmseTables にまとめる
+    # モデルごとに読み込んだ直後に target をコードに変換し、文字列は辞書にだけ残す
+    # dtype=np.float32 にすると、値の配列のメモリ使用量が半分になる
+    targets = None
+    parts = []
+    for model, file_path in csv_files.items():
+        names, means, errors = _read_model_table(
+            file_path, model not in no_variance_models
+        )
+        if targets is None:
+            targets = names
+            codes = np.arange(len(names))
+        else:
+            codes = targets.get_indexer(names)
+            new = codes < 0
+            if new.any():
+                targets = targets.append(names[new])
+                codes[new] = targets.get_indexer(names[new])
+        parts.append((codes, means, errors))
+    if targets is None:
+        targets = pd.Index([], dtype=object)
+
+    shape = (len(parts), len(targets), 2)
+    values = np.full(shape, np.nan, dtype=dtype)
+    errors = np.full(shape, np.nan, dtype=dtype)
+    present = np.zeros(shape[:2], dtype=bool)
+    for i, (codes, model_means, model_errors) in enumerate(parts):
+        values[i, codes] = model_means
+        errors[i, codes] = model_errors
+        present[i, codes] = True
+    return RmseTables(csv_files.keys(), targets, values, errors, present)
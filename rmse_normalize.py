@@ -0,0 +1,57 @@
+import numpy as np
+
+# --- 正規化モード ---
+# max_both     : 各target内で、全モデルの内挿・外挿の最大値で割る
+# max_separate : 各target内で、内挿と外挿をそれぞれの最大値で個別に割る
+# lr_baseline  : 各target内で、基準モデル（LR）の内挿・外挿の大きい方で割る
+NORMALIZATION_MODES = ('max_both', 'max_separate', 'lr_baseline')
+
+# --- 3次元配列の最後の軸（INTER, EXTRA）の名前 ---
+RMSE_TYPES = ('Inter', 'Extra')
+
+
+def _nanmax(array, axis):
+    # NaNを無視した最大値（全てNaNの場合は-inf、警告は出さない）
+    return np.where(np.isnan(array), -np.inf, array).max(axis=axis)
+
+
+def _safe_factor(factor):
+    # 値がない（-inf）、または0の場合は1で割る
+    return np.where(np.isfinite(factor) & (factor != 0), factor, 1.0)
+
+
+def normalization_factors(values, mode, models=None, baseline='LR'):
+    # valuesと同じ形にブロードキャストできる正規化係数を返す
+    if mode == 'max_both':
+        factor = _nanmax(values, axis=(0, 2))[np.newaxis, :, np.newaxis]
+    elif mode == 'max_separate':
+        factor = _nanmax(values, axis=0)[np.newaxis, :, :]
+    elif mode == 'lr_baseline':
+        # 基準モデルを選んでいない場合は正規化しない（従来の norm_factor = 1 と同じ）
+        if models is None or baseline not in models:
+            return np.ones((1, values.shape[1], 1))
+        baseline_values = values[list(models).index(baseline)]
+        factor = _nanmax(baseline_values, axis=1)[np.newaxis, :, np.newaxis]
+    else:
+        raise ValueError(
+            f"Unknown normalization mode: {mode} "
+            f"(choose from {', '.join(NORMALIZATION_MODES)})"
+        )
+    return _safe_factor(factor)
+
+
+def normalize_rmse(values, errors, mode, models=None, baseline='LR'):
+    # 値とエラーを同じ係数で正規化
+    factor = normalization_factors(
+        values, mode, models=models, baseline=baseline
+    )
+    return values / factor, errors / factor
+
+
+def to_series_dict(array, models):
+    # 従来の series_data / error_data と同じキー（"{model}_Inter" など）の辞書に変換
+    series = {}
+    for i, model in enumerate(models):
+        for k, rmse_type in enumerate(RMSE_TYPES):
+            series[f"{model}_{rmse_type}"] = array[i, :, k]
+    return series
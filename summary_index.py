@@ -0,0 +1,216 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from atomic_file import atomic_write
+from complexity_store import add_store_argument, open_store
+from csv_cache import read_csv_cached
+
+# --- エポック数・Complexity の探索結果の要約（インデックス） ---
+# targetごとに、次の値をまとめて計算して小さなCSVに保存する
+# （グラフや集計のたびに元の大きなCSVを走査しなくてよいように）
+#   target_summary.csv : val_rmse が最小のエポック数とそのときの val/test RMSE、
+#                        外挿の差（test_rmse - val_rmse）、
+#                        Range2_RMSE が最小になる（改善が止まる）Complexity
+#   pareto_front.csv   : (Complexity, Range2_RMSE) のパレート最適な点
+#                        （Complexity がより小さい点のどれよりも RMSE が小さい点）
+# 計算はすべてのtargetをまとめた配列の並べ替えとグループ演算で行う
+SUMMARY_NAME = 'target_summary.csv'
+PARETO_NAME = 'pareto_front.csv'
+# target_summary.csv の整数の列
+INTEGER_COLUMNS = ['best_epochs', 'n_pareto']
+
+# 既定の保存先フォルダ
+save_dir = "/Users/sshunsuke/Downloads/"
+
+
+def epoch_summary(grouped):
+    # aggregate_epoch_means の結果（target, epochs ごとの fold の平均）から、
+    # targetごとに val_rmse が最小の行を選ぶ（同じ値ならエポック数の小さい方）
+    best = grouped.sort_values(
+        ['target', 'val_rmse', 'epochs'], na_position='last', kind='stable'
+    ).drop_duplicates('target')
+    best = best[best['val_rmse'].notna()]
+    return pd.DataFrame(
+        {
+            'target': best['target'].to_numpy(),
+            'best_epochs': best['epochs'].to_numpy(),
+            'val_rmse': best['val_rmse'].to_numpy(),
+            'test_rmse': best['test_rmse'].to_numpy(),
+            'extrapolation_gap': (
+                best['test_rmse'] - best['val_rmse']
+            ).to_numpy(),
+        }
+    )
+
+
+def pareto_front(points, rmse_column='Range2_RMSE'):
+    # points（target, Complexity, RMSE の列）から、targetごとのパレート最適な点を返す
+    # Complexity 順に並べたときに、それまでの最小値より RMSE が小さい点だけを残す
+    points = points.dropna(subset=['Complexity', rmse_column])
+    points = points.sort_values(
+        ['target', 'Complexity', rmse_column], kind='stable'
+    ).reset_index(drop=True)
+    by_target = points.groupby('target', sort=False)[rmse_column]
+    # 同じtargetのそれまでの行の最小値（先頭の行は inf）
+    previous_min = (
+        by_target.cummin().groupby(points['target']).shift(fill_value=np.inf)
+    )
+    return points[points[rmse_column] < previous_min].reset_index(drop=True)
+
+
+def complexity_summary(front, rmse_column='Range2_RMSE'):
+    # パレート最適な点の最後（RMSE が最小になる Complexity）と点の数
+    last = front.drop_duplicates('target', keep='last')
+    counts = front.groupby('target', sort=False).size()
+    return pd.DataFrame(
+        {
+            'target': last['target'].to_numpy(),
+            'best_complexity': last['Complexity'].to_numpy(),
+            'best_range2_rmse': last[rmse_column].to_numpy(),
+            'n_pareto': pd.array(
+                counts.loc[last['target']].to_numpy(), dtype='Int64'
+            ),
+        }
+    )
+
+
+def build_summary(grouped=None, points=None):
+    # (target_summary, pareto_front) を返す
+    # grouped（エポックの集計）と points（Complexity の探索結果）の片方だけでもよい
+    summaries = []
+    front = None
+    if grouped is not None:
+        summaries.append(epoch_summary(grouped))
+    if points is not None:
+        front = pareto_front(points)
+        summaries.append(complexity_summary(front))
+    if not summaries:
+        return pd.DataFrame(columns=['target']), front
+    summary = summaries[0]
+    for other in summaries[1:]:
+        summary = summary.merge(other, on='target', how='outer')
+    # 片方にしかないtargetがあると外部結合で整数の列が float になるため、
+    # 欠損を許す整数型に戻す（CSVに 1000.0 ではなく 1000 と書き出す）
+    for column in INTEGER_COLUMNS:
+        if column in summary.columns:
+            summary[column] = summary[column].astype('Int64')
+    return summary.sort_values('target').reset_index(drop=True), front
+
+
+def load_complexity_points(
+    targets, results_path=None, store_path=None, min_complexity=None
+):
+    # targetごとの (Complexity, Sqrt_Loss, Range2_RMSE) をまとめたDataFrame
+    # store_path 指定時は統合ストアから、なければtargetごとのCSVから読む
+    # （CSVがないtargetは飛ばす）
+    if store_path is not None:
+        store = open_store(store_path)
+        if store is None:
+            raise FileNotFoundError(2, "No such file", store_path)
+        return store.frame(targets, min_complexity=min_complexity)
+
+    filters = None
+    if min_complexity is not None:
+        filters = [('Complexity', '>=', min_complexity)]
+    frames = []
+    for target in targets:
+        try:
+            df = read_csv_cached(
+                results_path.format(target=target),
+                usecols=['Complexity', 'Loss', 'Range2_RMSE'],
+                filters=filters,
+            )
+        except FileNotFoundError as e:
+            print(f"Warning: File not found - {e.filename}")
+            continue
+        frames.append(
+            pd.DataFrame(
+                {
+                    'target': target,
+                    'Complexity': df['Complexity'].to_numpy(dtype=float),
+                    'Sqrt_Loss': np.sqrt(df['Loss'].to_numpy(dtype=float)),
+                    'Range2_RMSE': df['Range2_RMSE'].to_numpy(dtype=float),
+                }
+            )
+        )
+    if not frames:
+        return pd.DataFrame(
+            columns=['target', 'Complexity', 'Sqrt_Loss', 'Range2_RMSE']
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def _write_csv_atomic(df, path):
+    with atomic_write(path) as tmp_path:
+        df.to_csv(tmp_path, index=False)
+
+
+def write_summary(output_dir, summary, front=None):
+    # target_summary.csv と pareto_front.csv を output_dir に保存
+    os.makedirs(output_dir, exist_ok=True)
+    summary_path = os.path.join(output_dir, SUMMARY_NAME)
+    _write_csv_atomic(summary, summary_path)
+    if front is not None:
+        _write_csv_atomic(front, os.path.join(output_dir, PARETO_NAME))
+    print(f"Saved summary of {len(summary)} targets in: {summary_path}")
+    return summary_path
+
+
+def read_summary(output_dir, targets=None, name=SUMMARY_NAME):
+    # 保存した要約を読み込む（targets 指定時はそのtargetの行だけ）
+    filters = None if targets is None else [('target', 'in', list(targets))]
+    return read_csv_cached(os.path.join(output_dir, name), filters=filters)
+
+
+def main():
+    # 既定の入力は draw_epochs.py / draw_plot.py と同じ
+    import draw_epochs
+    import draw_plot
+    from epoch_data import aggregate_epoch_means
+
+    parser = argparse.ArgumentParser(
+        description="targetごとの最良のエポック数・外挿の差・"
+        "Complexity のパレート最適な点を小さなCSVにまとめます"
+    )
+    parser.add_argument(
+        '--output-dir', default=save_dir, help="要約のCSVの保存先フォルダ"
+    )
+    parser.add_argument(
+        '--epochs-file',
+        default=draw_epochs.file_path,
+        help="results_epochs_evaluation.csv のパス",
+    )
+    parser.add_argument(
+        '--results-path',
+        default=draw_plot.error_results_path,
+        help="targetごとの Complexity のCSVのパス（'{target}' を含む）",
+    )
+    add_store_argument(parser)
+    parser.add_argument(
+        '--min-complexity',
+        type=float,
+        default=draw_plot.min_complexity,
+        help="パレート最適な点を探す Complexity の下限（グラフと同じ）",
+    )
+    args = parser.parse_args()
+
+    try:
+        grouped = aggregate_epoch_means(
+            args.epochs_file, ['val_rmse', 'test_rmse']
+        )
+    except FileNotFoundError:
+        print(f"Warning: File not found - {args.epochs_file}")
+        grouped = None
+    points = load_complexity_points(
+        draw_plot.target_columns,
+        results_path=args.results_path,
+        store_path=args.store,
+        min_complexity=args.min_complexity,
+    )
+    write_summary(args.output_dir, *build_summary(grouped, points))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+from bootstrap import (
+    add_bootstrap_arguments,
+    bootstrap_group_ci,
+    bootstrap_mean_ci,
+)
+
+
+def naive_mean_ci(values, sizes, n_resamples, confidence, seed):
+    # グループごと・復元抽出ごとにループで平均を求める
+    # （乱数は bootstrap_mean_ci が1つのブロックで引く順番と同じ）
+    picks = np.random.default_rng(seed).random((n_resamples, sum(sizes)))
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+    lower, upper = [], []
+    start = 0
+    for size in sizes:
+        if size == 0:
+            lower.append(np.nan)
+            upper.append(np.nan)
+            continue
+        means = []
+        for r in range(n_resamples):
+            sample = [
+                values[start + int(picks[r, start + j] * size)]
+                for j in range(size)
+            ]
+            means.append(sum(sample) / size)
+        low, high = np.quantile(means, quantiles)
+        lower.append(low)
+        upper.append(high)
+        start += size
+    return np.array(lower), np.array(upper)
+
+
+@pytest.mark.parametrize('confidence', [0.5, 0.95])
+def test_mean_ci_matches_naive_loop(confidence):
+    rng = np.random.default_rng(1)
+    sizes = [5, 0, 1, 3, 8]
+    values = rng.normal(size=sum(sizes))
+    actual = bootstrap_mean_ci(
+        values,
+        sizes,
+        n_resamples=50,
+        confidence=confidence,
+        rng=np.random.default_rng(7),
+    )
+    expected = naive_mean_ci(values, sizes, 50, confidence, 7)
+    np.testing.assert_allclose(actual[0], expected[0])
+    np.testing.assert_allclose(actual[1], expected[1])
+
+
+def test_mean_ci_in_small_blocks(monkeypatch):
+    # 添字行列を小さなブロックに分けても、各グループの値の範囲に収まる
+    import bootstrap
+
+    monkeypatch.setattr(bootstrap, 'MAX_BATCH_ELEMENTS', 64)
+    rng = np.random.default_rng(2)
+    sizes = rng.integers(1, 10, 30)
+    values = rng.normal(size=sizes.sum())
+    values[: sizes[0]] = 3.0  # 値が1つしかないグループ
+    lower, upper = bootstrap_mean_ci(values, sizes, n_resamples=20, rng=rng)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    for k, (start, size) in enumerate(zip(starts, sizes)):
+        group = values[start : start + size]
+        assert group.min() <= lower[k] <= upper[k] <= group.max()
+    assert lower[0] == upper[0] == 3.0
+
+
+def test_group_ci_matches_groupby_order():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(
+        {
+            'target': rng.choice(['b', 'a', 'c'], 60),
+            'epochs': rng.choice([10, 1], 60),
+            'value': rng.normal(size=60),
+        }
+    )
+    ci = bootstrap_group_ci(
+        df, ['target', 'epochs'], ['value'], n_resamples=20, seed=0
+    )
+    means = df.groupby(['target', 'epochs'])['value']
+    expected = means.size().index.to_frame(index=False)
+    pd.testing.assert_frame_equal(ci[['target', 'epochs']], expected)
+    assert (ci['value_ci_low'] <= means.mean().to_numpy()).all()
+    assert (ci['value_ci_high'] >= means.mean().to_numpy()).all()
+
+
+def test_group_ci_skips_rows_with_nan_keys():
+    df = pd.DataFrame(
+        {
+            'target': ['a', 'a', None, 'b', 'b', 'b'],
+            'value': [1.0, 3.0, 100.0, 2.0, np.nan, 4.0],
+        }
+    )
+    ci = bootstrap_group_ci(df, ['target'], ['value'], seed=0)
+    assert list(ci['target']) == ['a', 'b']
+    assert (ci['value_ci_low'] >= [1.0, 2.0]).all()
+    assert (ci['value_ci_high'] <= [3.0, 4.0]).all()
+
+
+@pytest.mark.parametrize(
+    'argv',
+    [
+        ['--bootstrap', '-1'],
+        ['--confidence', '0'],
+        ['--confidence', '1'],
+        ['--confidence', '95'],
+    ],
+)
+def test_invalid_bootstrap_arguments_are_rejected(argv):
+    parser = argparse.ArgumentParser()
+    add_bootstrap_arguments(parser)
+    with pytest.raises(SystemExit):
+        parser.parse_args(argv)
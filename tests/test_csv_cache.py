@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from csv_cache import (
+    _has_parquet_engine,
+    cache_path_for,
+    filter_rows,
+    iter_csv_chunks,
+    read_csv_cached,
+)
+
+FILTERS = [
+    [('value', '==', 1.0)],
+    [('value', '!=', 1.0)],
+    [('value', '<', 3.0)],
+    [('value', '>=', 2.0)],
+    [('value', 'in', [1.0, 3.0])],
+    [('value', 'not in', [1.0])],
+    [('target', '!=', 'a')],
+    [('target', 'not in', ['a'])],
+    [('target', 'in', ['a', 'c']), ('value', '>', 0.0)],
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'data.csv'
+    pd.DataFrame(
+        {
+            'target': ['a', None, 'c', 'a', 'b', 'c'],
+            'value': [1.0, 2.0, np.nan, 3.0, 1.0, 2.0],
+            'epochs': [1, 2, 3, 4, 5, 6],
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+def naive_filter(df, filters):
+    # 1行ずつ条件を確かめる（値がNaNの行はどの条件でも残らない）
+    keep = []
+    for _, row in df.iterrows():
+        ok = True
+        for column, op, value in filters:
+            x = row[column]
+            if pd.isna(x):
+                ok = False
+            elif op == 'in':
+                ok &= x in value
+            elif op == 'not in':
+                ok &= x not in value
+            else:
+                ok &= {
+                    '==': x == value,
+                    '!=': x != value,
+                    '<': x < value,
+                    '<=': x <= value,
+                    '>': x > value,
+                    '>=': x >= value,
+                }[op]
+        keep.append(ok)
+    return df[keep]
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_filter_rows_matches_naive_loop(csv_path, filters):
+    df = pd.read_csv(csv_path)
+    expected = naive_filter(df, filters)
+    pd.testing.assert_frame_equal(filter_rows(df, filters), expected)
+
+
+@pytest.mark.skipif(not _has_parquet_engine(), reason="pyarrow is required")
+@pytest.mark.parametrize('filters', FILTERS)
+def test_cold_and_warm_reads_match(csv_path, tmp_path, filters):
+    # 1回目（キャッシュの作成）と2回目（Parquetから読む）で同じ行が返る
+    cache_dir = str(tmp_path / 'cache')
+    usecols = ['target', 'value']
+    cold = read_csv_cached(
+        csv_path, usecols=usecols, cache_dir=cache_dir, filters=filters
+    )
+    warm = read_csv_cached(
+        csv_path, usecols=usecols, cache_dir=cache_dir, filters=filters
+    )
+    expected = naive_filter(pd.read_csv(csv_path), filters)[usecols]
+    pd.testing.assert_frame_equal(
+        cold, expected.reset_index(drop=True), check_dtype=False
+    )
+    pd.testing.assert_frame_equal(warm, cold)
+
+
+@pytest.mark.skipif(not _has_parquet_engine(), reason="pyarrow is required")
+def test_cache_is_built_in_chunks(tmp_path, monkeypatch):
+    # 後のチャンクで欠損が現れる整数の列も、CSVと同じ値で読める
+    import csv_cache
+
+    path = tmp_path / 'late_nan.csv'
+    pd.DataFrame({'n': [1, 2, 3, None, 5]}).to_csv(path, index=False)
+    cached_chunks = csv_cache._cached_chunks
+    monkeypatch.setattr(
+        csv_cache,
+        '_cached_chunks',
+        lambda csv_path, cache_path, chunksize=2: cached_chunks(
+            csv_path, cache_path, chunksize=2
+        ),
+    )
+    cache_dir = str(tmp_path / 'cache')
+    cold = read_csv_cached(str(path), cache_dir=cache_dir)
+    warm = read_csv_cached(str(path), cache_dir=cache_dir)
+    expected = pd.read_csv(path)['n'].to_numpy()
+    np.testing.assert_array_equal(cold['n'].to_numpy(dtype=float), expected)
+    np.testing.assert_array_equal(warm['n'].to_numpy(dtype=float), expected)
+
+
+@pytest.mark.skipif(not _has_parquet_engine(), reason="pyarrow is required")
+def test_iter_csv_chunks_populates_cache(csv_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    filters = [('value', '!=', 1.0)]
+    cold = list(
+        iter_csv_chunks(csv_path, ['target', 'value'], 2, cache_dir, filters)
+    )
+    assert os.path.exists(cache_path_for(csv_path, cache_dir=cache_dir))
+    warm = list(
+        iter_csv_chunks(csv_path, ['target', 'value'], 2, cache_dir, filters)
+    )
+    pd.testing.assert_frame_equal(
+        pd.concat(warm, ignore_index=True),
+        pd.concat(cold, ignore_index=True),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.skipif(not _has_parquet_engine(), reason="pyarrow is required")
+def test_iter_csv_chunks_stopped_early_leaves_no_cache(csv_path, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    chunks = iter_csv_chunks(csv_path, ['value'], 2, str(cache_dir))
+    next(chunks)
+    chunks.close()
+    assert not os.path.exists(cache_path_for(csv_path, cache_dir=cache_dir))
+    assert not list(cache_dir.glob('*.tmp'))
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from decimate import MIN_POINTS, minmax_decimate
+
+
+def naive_decimate(x, y, max_points, log_x=False):
+    # 点ごとにバケットを求め、バケットごとに最小・最大の点をループで探す
+    points = [
+        (xi, yi)
+        for xi, yi in zip(x, y)
+        if np.isfinite(xi) and np.isfinite(yi) and (not log_x or xi > 0)
+    ]
+    if len(points) <= max_points:
+        return np.array([p[0] for p in points]), np.array(
+            [p[1] for p in points]
+        )
+    points.sort(key=lambda p: p[0])
+    position = [np.log10(p[0]) if log_x else p[0] for p in points]
+    n_buckets = max(1, (max_points - 2) // 2)
+    span = position[-1] - position[0]
+    keep = {0, len(points) - 1}
+    best = {}
+    for i, pos in enumerate(position):
+        bucket = 0
+        if span > 0:
+            bucket = min(
+                int((pos - position[0]) / span * n_buckets), n_buckets - 1
+            )
+        low, high = best.get(bucket, (i, i))
+        if points[i][1] < points[low][1]:
+            low = i
+        if points[i][1] >= points[high][1]:
+            high = i
+        best[bucket] = (low, high)
+    for low, high in best.values():
+        keep.update((low, high))
+    kept = [points[i] for i in sorted(keep)]
+    return np.array([p[0] for p in kept]), np.array([p[1] for p in kept])
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('log_x', [False, True])
+@pytest.mark.parametrize('max_points', [MIN_POINTS, 10, 101])
+def test_matches_naive_loop(seed, log_x, max_points):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0.1, 100, 500)
+    y = np.round(rng.normal(size=500), 1)  # 同じ値のyを含める
+    y[rng.integers(0, 500, 10)] = np.nan
+    actual = minmax_decimate(x, y, max_points, log_x=log_x)
+    expected = naive_decimate(x, y, max_points, log_x=log_x)
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_array_equal(actual[1], expected[1])
+    assert len(actual[0]) <= max_points
+
+
+def test_short_curves_are_unchanged():
+    x = np.array([3.0, 1.0, 2.0])
+    y = np.array([1.0, 2.0, 3.0])
+    actual = minmax_decimate(x, y, 10)
+    np.testing.assert_array_equal(actual[0], x)
+    np.testing.assert_array_equal(actual[1], y)
+
+
+def test_rejects_too_few_points():
+    with pytest.raises(ValueError):
+        minmax_decimate([1, 2, 3, 4, 5], [1, 2, 3, 4, 5], MIN_POINTS - 1)
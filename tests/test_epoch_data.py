@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from epoch_data import (
+    EPOCH_KEYS,
+    aggregate_epoch_means,
+    epoch_filters,
+    split_by_target,
+)
+
+METRICS = ['val_rmse', 'test_rmse']
+
+
+@pytest.fixture
+def epochs_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame(
+        {
+            'target': rng.choice(['dGs', 'logP', 'Tm'], n),
+            'epochs': rng.choice([1, 10, 100], n),
+            'fold': np.arange(n) % 5,
+            'val_rmse': rng.gamma(2.0, 0.5, n),
+            'test_rmse': rng.gamma(2.0, 0.8, n),
+        }
+    )
+    df.loc[rng.integers(0, n, 20), 'val_rmse'] = np.nan
+    path = tmp_path / 'results_epochs_evaluation.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize('chunksize', [7, 1_000_000])
+def test_means_match_groupby(epochs_csv, chunksize):
+    # 従来の data.groupby(['target', 'epochs']).mean() と同じ結果になる
+    expected = (
+        pd.read_csv(epochs_csv)
+        .groupby(EPOCH_KEYS)[METRICS]
+        .mean()
+        .reset_index()
+    )
+    actual = aggregate_epoch_means(epochs_csv, METRICS, chunksize=chunksize)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_filters_match_filtered_groupby(epochs_csv):
+    data = pd.read_csv(epochs_csv)
+    data = data[data['target'].isin(['dGs', 'Tm']) & (data['epochs'] >= 10)]
+    expected = data.groupby(EPOCH_KEYS)[METRICS].mean().reset_index()
+    actual = aggregate_epoch_means(
+        epochs_csv,
+        METRICS,
+        chunksize=11,
+        filters=epoch_filters(targets=['dGs', 'Tm'], min_epochs=10),
+    )
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_split_matches_loop_over_targets(epochs_csv):
+    grouped = aggregate_epoch_means(epochs_csv, METRICS)
+    parts = split_by_target(grouped)
+    assert [target for target, _ in parts] == sorted(
+        grouped['target'].unique()
+    )
+    for target, subset in parts:
+        pd.testing.assert_frame_equal(
+            subset, grouped[grouped['target'] == target]
+        )
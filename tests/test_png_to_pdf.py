@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from png_to_pdf import ImagePdfWriter, fit_to_page, pack_combined
+
+Image = pytest.importorskip('PIL.Image')
+pypdf = pytest.importorskip('pypdf')
+
+
+def make_images(tmp_path):
+    # そのまま埋め込む画像（RGB・グレー・パレット・JPEG）と、変換する画像（RGBA）
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, (30, 40, 3), dtype=np.uint8)
+    images = {
+        'rgb.png': Image.fromarray(rgb),
+        'gray.png': Image.fromarray(rgb[..., 0]),
+        'palette.png': Image.fromarray(rgb).quantize(256),
+        'photo.jpg': Image.fromarray(rgb),
+        'rgba.png': Image.fromarray(
+            np.dstack([rgb, np.full((30, 40), 255, np.uint8)])
+        ),
+    }
+    paths = []
+    for name, image in images.items():
+        path = tmp_path / name
+        image.save(path)
+        paths.append(str(path))
+    return paths
+
+
+def decoded(img_path):
+    # Pillow で直接デコードした画素（PDFから取り出した画像と比べる）
+    with Image.open(img_path) as img:
+        if img.mode == 'L':
+            return np.asarray(img)
+        return np.asarray(img.convert('RGB'))
+
+
+def test_pages_hold_the_original_pixels(tmp_path):
+    paths = make_images(tmp_path)
+    pdf_path = tmp_path / 'images.pdf'
+    pack_combined(paths + [str(tmp_path / 'missing.png')], str(pdf_path))
+    reader = pypdf.PdfReader(pdf_path)
+    assert len(reader.pages) == len(paths)
+    for page, path in zip(reader.pages, paths):
+        if path.endswith('.jpg'):
+            # JPEGはファイルのバイト列をそのまま埋め込む
+            stream = page['/Resources']['/XObject']['/Im0']
+            with open(path, 'rb') as f:
+                assert stream.get_data() == f.read()
+            continue
+        (image,) = page.images
+        pixels = np.asarray(image.image)
+        if pixels.ndim == 3:
+            pixels = pixels[..., :3]
+        np.testing.assert_array_equal(pixels, decoded(path))
+
+
+def test_empty_and_missing_files_are_skipped(tmp_path, capsys):
+    empty = tmp_path / 'empty.png'
+    empty.write_bytes(b'')
+    (good,) = make_images(tmp_path)[:1]
+    pdf_path = tmp_path / 'images.pdf'
+    pack_combined([str(empty), good, str(tmp_path / 'no.png')], str(pdf_path))
+    assert len(pypdf.PdfReader(pdf_path).pages) == 1
+    out = capsys.readouterr().out
+    assert 'Warning: Empty file' in out
+    assert 'Warning: File not found' in out
+    with pytest.raises(ValueError):
+        with ImagePdfWriter(str(tmp_path / 'other.pdf')) as pdf:
+            pdf.add_image_page(str(empty))
+
+
+@pytest.mark.parametrize('size', [(40, 30), (30, 400), (210, 297)])
+def test_fit_to_page_keeps_aspect_ratio(size):
+    x, y, w, h = fit_to_page(*size)
+    assert w / h == pytest.approx(size[0] / size[1])
+    assert (w == pytest.approx(210)) or (h == pytest.approx(297))
+    assert x == pytest.approx((210 - w) / 2)
+    assert y == pytest.approx((297 - h) / 2)
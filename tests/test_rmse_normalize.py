@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+import pytest
+from rmse_normalize import NORMALIZATION_MODES, normalize_rmse, to_series_dict
+
+MODELS = ['LR', 'NN', 'SR']
+
+
+def naive_factor(values, mode, models, target, k):
+    # 従来のスクリプトと同じく、targetごとにループで正規化係数を求める
+    def largest(numbers):
+        numbers = [v for v in numbers if not math.isnan(v)]
+        return max(numbers) if numbers else None
+
+    if mode == 'max_both':
+        factor = largest(values[:, target].ravel())
+    elif mode == 'max_separate':
+        factor = largest(values[:, target, k])
+    elif 'LR' in models:
+        factor = largest(values[models.index('LR'), target])
+    else:
+        factor = 1.0
+    return factor if factor else 1.0
+
+
+def random_arrays(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.gamma(2.0, 0.5, (len(MODELS), 7, 2))
+    errors = rng.gamma(1.0, 0.05, (len(MODELS), 7, 2))
+    values[1, 2, 0] = np.nan  # 欠損の値
+    values[:, 3] = np.nan  # すべてのモデルで欠損のtarget
+    values[:, 4] = 0.0  # 0で割らない
+    return values, errors
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('mode', NORMALIZATION_MODES)
+@pytest.mark.parametrize('models', [MODELS, ['NN', 'SR', 'LR'], ['NN', 'SR']])
+def test_matches_naive_loop(seed, mode, models):
+    values, errors = random_arrays(seed)
+    values = values[: len(models)]
+    errors = errors[: len(models)]
+    norm_values, norm_errors = normalize_rmse(
+        values, errors, mode, models=models
+    )
+    for i, model in enumerate(models):
+        for target in range(values.shape[1]):
+            for k in range(2):
+                factor = naive_factor(values, mode, models, target, k)
+                np.testing.assert_equal(
+                    norm_values[i, target, k], values[i, target, k] / factor
+                )
+                np.testing.assert_equal(
+                    norm_errors[i, target, k], errors[i, target, k] / factor
+                )
+
+
+def test_unknown_mode_is_rejected():
+    values, errors = random_arrays(0)
+    with pytest.raises(ValueError):
+        normalize_rmse(values, errors, 'median', models=MODELS)
+
+
+def test_series_dict_keys():
+    values, _ = random_arrays(0)
+    series = to_series_dict(values, MODELS)
+    assert list(series) == [
+        f"{model}_{kind}" for model in MODELS for kind in ('Inter', 'Extra')
+    ]
+    np.testing.assert_array_equal(series['NN_Extra'], values[1, :, 1])
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from summary_index import build_summary, pareto_front
+
+
+def naive_pareto_front(points):
+    # targetごとに Complexity 順に見ていき、それまでの最小値より小さい点を残す
+    rows = []
+    for target in sorted(points['target'].unique()):
+        subset = points[points['target'] == target].dropna(
+            subset=['Complexity', 'Range2_RMSE']
+        )
+        best = np.inf
+        for _, row in subset.sort_values(
+            ['Complexity', 'Range2_RMSE'], kind='stable'
+        ).iterrows():
+            if row['Range2_RMSE'] < best:
+                best = row['Range2_RMSE']
+                rows.append(row)
+    return pd.DataFrame(rows).reset_index(drop=True)
+
+
+def random_points(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    points = pd.DataFrame(
+        {
+            'target': rng.choice(['dGs', 'logP', 'Tm'], n),
+            'Complexity': rng.integers(1, 40, n).astype(float),
+            'Range2_RMSE': np.round(rng.gamma(2.0, 0.5, n), 2),
+        }
+    )
+    points.loc[rng.integers(0, n, 10), 'Range2_RMSE'] = np.nan
+    return points
+
+
+def test_pareto_front_matches_naive_loop():
+    for seed in range(5):
+        points = random_points(seed)
+        pd.testing.assert_frame_equal(
+            pareto_front(points), naive_pareto_front(points)
+        )
+
+
+def test_summary_keeps_integer_columns():
+    points = random_points(0)
+    grouped = pd.DataFrame(
+        {
+            'target': ['dGs', 'dGs', 'RI'],
+            'epochs': [10, 1000, 100],
+            'val_rmse': [0.5, 0.4, 0.3],
+            'test_rmse': [0.6, 0.7, 0.2],
+        }
+    )
+    summary, front = build_summary(grouped, points)
+    assert list(summary['target']) == ['RI', 'Tm', 'dGs', 'logP']
+    assert str(summary['best_epochs'].dtype) == 'Int64'
+    assert (
+        summary.loc[summary['target'] == 'dGs', 'best_epochs'].item() == 1000
+    )
+    counts = front.groupby('target').size()
+    assert (summary.set_index('target')['n_pareto'].dropna() == counts).all()